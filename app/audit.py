@@ -0,0 +1,227 @@
+import asyncio
+from contextlib import contextmanager
+import fcntl
+import glob
+import json
+import os
+
+from app.config import AUDIT_SPOOL_PATH
+from app.db import get_async_supabase
+
+_STOP = object()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _rewrite(path: str, events: list[dict]) -> None:
+    tmp = path + ".tmp"
+
+    with open(tmp, "w") as f:
+        for event in events:
+            f.write(json.dumps(event, default=str) + "\n")
+
+    os.replace(tmp, path)
+
+
+class AuditLogWriter:
+    """
+    Batches audit_logs inserts off the request path.
+
+    log() only enqueues; a background task inserts up to `batch_size`
+    events at a time, waiting at most `flush_interval` seconds for a
+    batch to fill. The queue is bounded, so if the DB falls far enough
+    behind, callers wait in log() rather than memory growing without
+    limit.
+
+    Batches the DB rejects are appended to a JSON-lines spool at
+    `spool_path` and replayed once inserts succeed again. Every worker
+    shares the spool, so it's only touched under an flock on
+    `<spool_path>.lock`. A replaying worker first moves the spool into
+    its own `<spool_path>.replay.<pid>` file and only deletes that once
+    every event in it is inserted; replay files left by workers that
+    died are adopted by the next one to replay. Replay is at-least-once:
+    a crash mid-replay can insert some events twice.
+    Until start() is called, events are written through.
+    """
+
+    def __init__(
+        self,
+        spool_path: str,
+        max_queue: int = 10_000,
+        batch_size: int = 200,
+        flush_interval: float = 1.0
+    ):
+        self.spool_path = spool_path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._spooled = False
+        self._replay_lock = asyncio.Lock()
+
+    async def log(self, event: dict) -> None:
+        if self._queue is None:
+            await self._write([event])
+        else:
+            await self._queue.put(event)
+
+    async def _write(self, batch: list[dict]) -> bool:
+        supabase = get_async_supabase()
+
+        try:
+            await supabase.table("audit_logs").insert(batch).execute()
+        except Exception as e:
+            print("AUDIT FLUSH ERROR:", e)
+            await asyncio.to_thread(self._spool, batch)
+            return False
+
+        if self._spooled:
+            await self._replay_spool()
+        return True
+
+    @contextmanager
+    def _locked(self):
+        with open(self.spool_path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _spool(self, batch: list[dict]) -> None:
+        if not batch:
+            return
+
+        with self._locked(), open(self.spool_path, "a") as f:
+            for event in batch:
+                f.write(json.dumps(event, default=str) + "\n")
+
+        self._spooled = True
+
+    def _claim_spool(self) -> str | None:
+        """
+        Move the shared spool, and the replay files of dead workers, into
+        this process's replay file. Returns its path if there's anything
+        to replay.
+        """
+        mine = f"{self.spool_path}.replay.{os.getpid()}"
+
+        with self._locked():
+            sources = [
+                path for path in glob.glob(f"{self.spool_path}.replay.*")
+                if path != mine
+                and path.rsplit(".", 1)[1].isdigit()
+                and not _alive(int(path.rsplit(".", 1)[1]))
+            ]
+            if os.path.exists(self.spool_path):
+                sources.append(self.spool_path)
+
+            for path in sources:
+                with open(path) as src, open(mine, "a") as dst:
+                    dst.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.remove(path)
+
+        return mine if os.path.exists(mine) else None
+
+    async def _replay_spool(self) -> None:
+        async with self._replay_lock:
+            self._spooled = False
+
+            path = await asyncio.to_thread(self._claim_spool)
+            if path is None:
+                return
+
+            with open(path) as f:
+                events = [json.loads(line) for line in f if line.strip()]
+
+            supabase = get_async_supabase()
+
+            for i in range(0, len(events), self.batch_size):
+                try:
+                    await supabase.table("audit_logs") \
+                        .insert(events[i:i + self.batch_size]) \
+                        .execute()
+                except Exception as e:
+                    print("AUDIT REPLAY ERROR:", e)
+                    # keep only what's left for the next attempt
+                    await asyncio.to_thread(_rewrite, path, events[i:])
+                    self._spooled = True
+                    return
+
+            os.remove(path)
+
+    async def _next_batch(self) -> tuple[list[dict], bool]:
+        """Up to batch_size events, and whether close() asked us to stop."""
+        event = await self._queue.get()
+        if event is _STOP:
+            return [], True
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        batch = [event]
+
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+
+            try:
+                event = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+
+            if event is _STOP:
+                return batch, True
+            batch.append(event)
+
+        return batch, False
+
+    async def _run(self) -> None:
+        # pick up anything spooled before a restart
+        try:
+            await self._replay_spool()
+        except Exception as e:
+            print("AUDIT SPOOL ERROR:", e)
+
+        while True:
+            batch, stop = await self._next_batch()
+
+            if batch:
+                try:
+                    await self._write(batch)
+                except Exception as e:
+                    # spool itself failed (disk full etc.); keep draining
+                    print("AUDIT SPOOL ERROR:", e)
+            if stop:
+                return
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Flush everything queued, then go back to writing through."""
+        if self._task is None:
+            return
+
+        await self._queue.put(_STOP)
+        await self._task
+
+        self._task = None
+        self._queue = None
+
+
+audit_log = AuditLogWriter(AUDIT_SPOOL_PATH)
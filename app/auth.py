@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import jwt
+
+from app.config import (
+    SUPABASE_URL,
+    SUPABASE_SERVICE_KEY,
+    SUPABASE_JWT_SECRET,
+    SUPABASE_JWT_PREVIOUS_SECRET,
+    SUPABASE_JWKS_URL,
+)
+from app.db import get_http_client
+
+JWT_AUDIENCE = "authenticated"
+HMAC_ALGORITHMS = ["HS256"]
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+
+JWKS_TTL_SECONDS = 600
+JWKS_MIN_REFRESH_SECONDS = 30
+
+
+class JWKSCache:
+    """
+    Caches the Supabase signing keys by `kid`.
+
+    Keys are refetched when the cache is stale or when a token arrives
+    with an unknown `kid` (key rotation), but never more often than
+    JWKS_MIN_REFRESH_SECONDS so bad tokens can't hammer the endpoint.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._keys: dict = {}
+        self._fetched_at = 0.0
+        # set even when the fetch fails, so an outage doesn't turn every
+        # request into another slow refresh attempt
+        self._attempted_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _refresh(self) -> None:
+        self._attempted_at = time.monotonic()
+
+        response = await get_http_client().get(self.url)
+        response.raise_for_status()
+
+        keys = {}
+        for jwk in response.json().get("keys", []):
+            if jwk.get("kid"):
+                keys[jwk["kid"]] = jwt.PyJWK(jwk).key
+
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    async def get_key(self, kid: str):
+        async with self._lock:
+            now = time.monotonic()
+            age = now - self._fetched_at
+
+            if now - self._attempted_at > JWKS_MIN_REFRESH_SECONDS and (
+                age > JWKS_TTL_SECONDS or kid not in self._keys
+            ):
+                await self._refresh()
+
+            key = self._keys.get(kid)
+
+        if key is None:
+            raise jwt.InvalidKeyError(f"Unknown signing key: {kid}")
+        return key
+
+
+jwks_cache = JWKSCache(SUPABASE_JWKS_URL)
+
+
+async def decode_token(token: str) -> dict:
+    """
+    Verify a Supabase access token locally.
+
+    HS256 tokens are checked against the project JWT secret (and the
+    previous secret while a rotation is in progress); asymmetric tokens
+    are checked against the cached JWKS.
+    """
+    header = jwt.get_unverified_header(token)
+    alg = header.get("alg")
+
+    if alg in HMAC_ALGORITHMS:
+        secrets = [SUPABASE_JWT_SECRET]
+        if SUPABASE_JWT_PREVIOUS_SECRET:
+            secrets.append(SUPABASE_JWT_PREVIOUS_SECRET)
+
+        for i, secret in enumerate(secrets):
+            try:
+                return jwt.decode(
+                    token,
+                    secret,
+                    algorithms=HMAC_ALGORITHMS,
+                    audience=JWT_AUDIENCE,
+                    options={"require": ["exp", "sub"]},
+                )
+            except jwt.InvalidSignatureError:
+                if i == len(secrets) - 1:
+                    raise
+
+    if alg in ASYMMETRIC_ALGORITHMS:
+        key = await jwks_cache.get_key(header.get("kid"))
+        return jwt.decode(
+            token,
+            key,
+            algorithms=ASYMMETRIC_ALGORITHMS,
+            audience=JWT_AUDIENCE,
+            options={"require": ["exp", "sub"]},
+        )
+
+    raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm: {alg}")
+
+
+async def fetch_remote_user(token: str) -> dict:
+    response = await get_http_client().get(
+        f"{SUPABASE_URL}/auth/v1/user",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "apikey": SUPABASE_SERVICE_KEY,
+        }
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def authenticate(token: str) -> tuple[str, str | None]:
+    """
+    Returns (user_id, email) for a valid token.
+
+    Local verification is the normal path. Expired tokens are rejected
+    outright; any other local failure (unknown key, rotated secret,
+    JWKS outage) falls back to asking Supabase Auth directly.
+    """
+    try:
+        claims = await decode_token(token)
+        return claims["sub"], claims.get("email")
+    except jwt.ExpiredSignatureError:
+        raise
+    except Exception:
+        pass
+
+    user_data = await fetch_remote_user(token)
+    return user_data["id"], user_data.get("email")
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries also expire after `ttl`
+    seconds. Keeps hit/miss counters so we can see whether it's paying
+    for itself.
+
+    `maxsize` bounds the total weight of the entries. By default every
+    entry weighs 1, so it's an entry count; pass `weigh` (e.g. len) to
+    bound by bytes instead.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, weigh=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.weigh = weigh or (lambda value: 1)
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._remove(key)
+
+            weight = self.weigh(value)
+            if weight > self.maxsize:
+                return
+
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._weight += weight
+
+            while self._weight > self.maxsize:
+                self._remove(next(iter(self._data)))
+
+    def _remove(self, key) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._weight -= self.weigh(entry[0])
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._weight = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "weight": self._weight,
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
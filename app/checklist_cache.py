@@ -0,0 +1,124 @@
+from datetime import date, datetime, timezone
+import re
+
+from app.cache import TTLCache
+from app.config import CHECKLIST_CACHE_PERSIST
+from app.db import get_async_supabase
+
+CHECKLIST_TTL_SECONDS = 7 * 24 * 3600
+
+BUDGET_BANDS = [10_000, 25_000, 50_000, 100_000]
+GUEST_BANDS = [50, 100, 150, 250]
+MONTH_BANDS = [3, 6, 12]
+
+# profile bucket -> list of task titles
+checklist_cache = TTLCache(maxsize=2_000, ttl=CHECKLIST_TTL_SECONDS)
+
+
+def _number(value) -> float | None:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    text = str(value).lower().replace(",", "")
+    match = re.search(r"\d+(?:\.\d+)?", text)
+    if not match:
+        return None
+
+    number = float(match.group())
+    if re.search(r"\d\s*k\b", text):
+        number *= 1_000
+    return number
+
+
+def _band(value: float | None, edges: list) -> str:
+    if value is None:
+        return "unknown"
+
+    lower = 0
+    for edge in edges:
+        if value < edge:
+            return f"{lower}-{edge}"
+        lower = edge
+    return f"{lower}+"
+
+
+def _months_until(wedding_date) -> float | None:
+    if not wedding_date:
+        return None
+
+    try:
+        day = date.fromisoformat(str(wedding_date)[:10])
+    except ValueError:
+        return None
+
+    return (day - date.today()).days / 30.4
+
+
+def profile_bucket(user_context: dict) -> str:
+    """
+    Cache key for a generated checklist. CHECKLIST_PROMPT only looks at
+    style, budget, guest_count and wedding_date, so profiles that land in
+    the same bands get the same checklist.
+    """
+    style = (user_context.get("style") or "unknown").strip().lower()
+
+    return "|".join([
+        style,
+        "budget:" + _band(_number(user_context.get("budget")), BUDGET_BANDS),
+        "guests:" + _band(_number(user_context.get("guest_count")), GUEST_BANDS),
+        "months:" + _band(_months_until(user_context.get("wedding_date")), MONTH_BANDS),
+    ])
+
+
+async def get_cached_checklist(key: str) -> list[str] | None:
+    tasks = checklist_cache.get(key)
+
+    if tasks is not None or not CHECKLIST_CACHE_PERSIST:
+        return tasks
+
+    try:
+        supabase = get_async_supabase()
+
+        rows = (
+            await supabase.table("checklist_templates")
+            .select("tasks,created_at")
+            .eq("bucket", key)
+            .limit(1)
+            .execute()
+        ).data
+    except Exception as e:
+        print("CHECKLIST CACHE READ ERROR:", e)
+        return None
+
+    if not rows:
+        return None
+
+    created_at = datetime.fromisoformat(rows[0]["created_at"])
+    age = (datetime.now(timezone.utc) - created_at).total_seconds()
+
+    if age > CHECKLIST_TTL_SECONDS:
+        return None
+
+    tasks = rows[0]["tasks"]
+    checklist_cache.set(key, tasks)
+    return tasks
+
+
+async def store_checklist(key: str, tasks: list[str]) -> None:
+    checklist_cache.set(key, tasks)
+
+    if not CHECKLIST_CACHE_PERSIST:
+        return
+
+    try:
+        supabase = get_async_supabase()
+
+        await supabase.table("checklist_templates").upsert({
+            "bucket": key,
+            "tasks": tasks,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }).execute()
+    except Exception as e:
+        print("CHECKLIST CACHE WRITE ERROR:", e)
@@ -7,7 +7,35 @@ OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY")
 SUPABASE_URL: str = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY: str = os.getenv("SUPABASE_SERVICE_KEY")
 SUPABASE_JWT_SECRET: str = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_PREVIOUS_SECRET: str | None = os.getenv("SUPABASE_JWT_PREVIOUS_SECRET")
+SUPABASE_JWKS_URL: str = os.getenv(
+    "SUPABASE_JWKS_URL",
+    f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json"
+)
 
 if not SUPABASE_JWT_SECRET:
     raise RuntimeError("SUPABASE_JWT_SECRET missing from environment")
 
+# "supabase" (direct) or "memory" (write-behind cache over Supabase).
+# "memory" never re-reads history for an active user, so it only sees
+# turns its own worker served: use it with a single worker or with sticky
+# routing that sends each user's requests to the same worker.
+CONVERSATION_STORE: str = os.getenv("CONVERSATION_STORE", "supabase")
+
+# share generated checklists across workers via the checklist_templates table
+CHECKLIST_CACHE_PERSIST: bool = os.getenv("CHECKLIST_CACHE_PERSIST", "false").lower() == "true"
+
+# background export jobs: "sqlite:<path>" or "memory". The SQLite file is
+# shared by every worker on the host, so a job can be polled from any of
+# them; "memory" only works with a single worker (or in tests).
+EXPORT_JOB_STORE: str = os.getenv("EXPORT_JOB_STORE", "sqlite:export_jobs.db")
+EXPORT_WORKERS: int = int(os.getenv("EXPORT_WORKERS", "2"))
+
+# audit events the DB rejects are spooled here and replayed later
+AUDIT_SPOOL_PATH: str = os.getenv("AUDIT_SPOOL_PATH", "audit_spool.jsonl")
+
+# JSON file overriding the chat pre-router's keyword rules (see app/intents.py)
+INTENT_RULES_PATH: str | None = os.getenv("INTENT_RULES_PATH")
+
+# prompt-token budget for /chat requests (see app/context.py)
+CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
@@ -0,0 +1,191 @@
+"""
+Builds the message list for a chat completion within a token budget.
+
+The system prompt gets a compact block of the couple's saved wedding
+details. History is added newest-first until the budget runs out, and
+any single old message longer than MAX_HISTORY_MESSAGE_TOKENS is cut
+down first so one long reply can't crowd out the rest.
+
+Tokens are counted with tiktoken when it's installed and its encoding
+can be loaded (the first load downloads it; load_encoding() does that at
+startup, off the event loop). Otherwise a rough estimate is used, which
+is good enough for budgeting but won't match the API's usage numbers
+exactly.
+"""
+from functools import lru_cache
+import re
+import threading
+
+from app.config import CONTEXT_TOKEN_BUDGET
+from app.prompts import SYSTEM_PROMPT
+
+CHAT_MODEL = "gpt-4o-mini"
+
+MAX_HISTORY_MESSAGE_TOKENS = 400
+
+# per-message framing the API adds around each message's content
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+PROFILE_LABELS = {
+    "style": "Style",
+    "budget": "Budget",
+    "guest_count": "Guest count",
+    "venue": "Venue",
+    "wedding_date": "Wedding date",
+    "celebrant": "Celebrant",
+}
+
+_ROUGH_TOKEN = re.compile(r"\w{1,4}|[^\w\s]")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        try:
+            return tiktoken.encoding_for_model(CHAT_MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # usually the BPE download failing; don't retry on every request
+        print("TOKENIZER LOAD ERROR:", e)
+        return None
+
+
+def load_encoding() -> bool:
+    """Load the tokenizer now. False means the rough estimate is in use."""
+    return _encoding() is not None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+
+    if encoding is None:
+        return len(_ROUGH_TOKEN.findall(text))
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text: str, limit: int) -> str:
+    encoding = _encoding()
+
+    if encoding is None:
+        tokens = list(_ROUGH_TOKEN.finditer(text))
+        if len(tokens) <= limit:
+            return text
+        return text[:tokens[limit].start()].rstrip() + " …"
+
+    tokens = encoding.encode(text)
+    if len(tokens) <= limit:
+        return text
+    return encoding.decode(tokens[:limit]).rstrip() + " …"
+
+
+def message_tokens(message: dict) -> int:
+    return TOKENS_PER_MESSAGE + count_tokens(message.get("content") or "")
+
+
+def profile_block(profile: dict | None) -> str:
+    lines = [
+        f"- {label}: {profile[field]}"
+        for field, label in PROFILE_LABELS.items()
+        if profile and profile.get(field) not in (None, "")
+    ]
+
+    if not lines:
+        return "Saved wedding details: none yet."
+    return "Saved wedding details:\n" + "\n".join(lines)
+
+
+class PromptTokenStats:
+    def __init__(self):
+        self.requests = 0
+        self.total = 0
+        self.max = 0
+        self.trimmed = 0
+        self._lock = threading.Lock()
+
+    def record(self, tokens: int, trimmed: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.total += tokens
+            self.max = max(self.max, tokens)
+            self.trimmed += trimmed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "avg": round(self.total / self.requests, 1) if self.requests else 0.0,
+                "max": self.max,
+                "trimmed": self.trimmed,
+                "budget": CONTEXT_TOKEN_BUDGET
+            }
+
+
+prompt_token_stats = PromptTokenStats()
+
+
+def build_context(
+    message: str,
+    history: list[dict],
+    profile: dict | None,
+    budget: int = CONTEXT_TOKEN_BUDGET
+) -> tuple[list[dict], int]:
+    """
+    The messages to send and their prompt-token count. The system prompt,
+    any system messages in `history` (the conversation summary) and the
+    new message always go in, even if they alone exceed the budget.
+    """
+    system = {
+        "role": "system",
+        "content": SYSTEM_PROMPT.strip() + "\n\n" + profile_block(profile)
+    }
+    user = {"role": "user", "content": message}
+
+    pinned = [turn for turn in history if turn["role"] == "system"]
+    turns = [turn for turn in history if turn["role"] != "system"]
+
+    used = TOKENS_PER_REPLY + message_tokens(system) + message_tokens(user)
+    used += sum(message_tokens(turn) for turn in pinned)
+    kept = []
+    trimmed = False
+
+    for turn in reversed(turns):
+        content = turn["content"]
+
+        if count_tokens(content) > MAX_HISTORY_MESSAGE_TOKENS:
+            content = truncate_tokens(content, MAX_HISTORY_MESSAGE_TOKENS)
+            trimmed = True
+
+        turn = {"role": turn["role"], "content": content}
+        cost = message_tokens(turn)
+
+        if used + cost > budget:
+            trimmed = True
+            break
+
+        kept.append(turn)
+        used += cost
+
+    prompt_token_stats.record(used, trimmed)
+    return [system, *pinned, *reversed(kept), user], used
+
+
+def build_generic_context(message: str) -> tuple[list[dict], int]:
+    """
+    A prompt with no profile or history, for replies that go in the
+    shared response cache (see app.response_cache).
+    """
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT.strip()},
+        {"role": "user", "content": message}
+    ]
+    used = TOKENS_PER_REPLY + sum(message_tokens(m) for m in messages)
+
+    prompt_token_stats.record(used, False)
+    return messages, used
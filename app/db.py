@@ -1,7 +1,47 @@
-from supabase import create_client, Client
+from supabase import create_client, Client, acreate_client, AsyncClient
+import httpx
 from app.config import SUPABASE_URL, SUPABASE_SERVICE_KEY
 
 supabase: Client = create_client(
     SUPABASE_URL,
     SUPABASE_SERVICE_KEY
 )
+
+# Shared async clients, created once per worker by the app lifespan hook.
+_async_supabase: AsyncClient | None = None
+_http_client: httpx.AsyncClient | None = None
+
+
+async def open_async_clients() -> None:
+    global _async_supabase, _http_client
+
+    _http_client = httpx.AsyncClient(
+        timeout=5,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+    )
+    _async_supabase = await acreate_client(
+        SUPABASE_URL,
+        SUPABASE_SERVICE_KEY
+    )
+
+
+async def close_async_clients() -> None:
+    global _async_supabase, _http_client
+
+    if _http_client is not None:
+        await _http_client.aclose()
+
+    _async_supabase = None
+    _http_client = None
+
+
+def get_async_supabase() -> AsyncClient:
+    if _async_supabase is None:
+        raise RuntimeError("Async Supabase client not initialised")
+    return _async_supabase
+
+
+def get_http_client() -> httpx.AsyncClient:
+    if _http_client is None:
+        raise RuntimeError("HTTP client not initialised")
+    return _http_client
@@ -0,0 +1,102 @@
+from abc import ABC, abstractmethod
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+
+from app.sync import SAFETY_LAG
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# /sync/feed hides change_log entries younger than SAFETY_LAG, so a
+# client reacting to an event sent straight after the write would get an
+# empty page. Events wait until the change is visible in the feed.
+PUSH_DELAY_SECONDS = SAFETY_LAG.total_seconds() + 0.5
+
+
+class Broker(ABC):
+    """
+    Per-user pub/sub for change notifications. LocalBroker only reaches
+    subscribers in this worker; a shared backend (Redis, Postgres
+    LISTEN/NOTIFY) can implement the same interface to fan out across
+    workers.
+    """
+
+    @abstractmethod
+    async def publish(self, user_id: str, event: dict) -> None:
+        ...
+
+    @abstractmethod
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        ...
+
+    @abstractmethod
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        ...
+
+
+class LocalBroker(Broker):
+    def __init__(self):
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+
+    async def publish(self, user_id: str, event: dict) -> None:
+        for queue in list(self._subscribers.get(user_id, ())):
+            if queue.full():
+                # events are just "go re-sync" hints, so losing the
+                # oldest one to a slow client is harmless
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(user_id)
+
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[user_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(s) for s in self._subscribers.values())
+
+
+broker = LocalBroker()
+
+# (user_id, table) -> pending delayed publish, and the loop time of the
+# latest write it covers. Writes to the same table while an event is
+# pending push it back, so the one event covers all of them.
+_pending: dict[tuple[str, str], asyncio.Task] = {}
+_last_write: dict[tuple[str, str], float] = {}
+
+
+async def _publish_later(user_id: str, table: str) -> None:
+    key = (user_id, table)
+    loop = asyncio.get_running_loop()
+
+    try:
+        while (wait := _last_write[key] + PUSH_DELAY_SECONDS - loop.time()) > 0:
+            await asyncio.sleep(wait)
+    finally:
+        _pending.pop(key, None)
+        _last_write.pop(key, None)
+
+    await broker.publish(user_id, {
+        "type": "change",
+        "table": table,
+        "at": datetime.utcnow().isoformat()
+    })
+
+
+async def publish_change(user_id: str, table: str) -> None:
+    """
+    Tell the user's connected clients that `table` changed, once the
+    change can be read from /sync/feed.
+    """
+    key = (user_id, table)
+    _last_write[key] = asyncio.get_running_loop().time()
+
+    if key not in _pending:
+        _pending[key] = asyncio.create_task(_publish_later(user_id, table))
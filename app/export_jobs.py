@@ -0,0 +1,382 @@
+from abc import ABC, abstractmethod
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import multiprocessing
+import os
+import sqlite3
+import threading
+import uuid
+
+from app.config import EXPORT_JOB_STORE, EXPORT_WORKERS
+from app.exports import (
+    fetch_budget_rows,
+    fetch_checklist_rows,
+    iter_tasks_csv,
+    render_budget_pdf,
+    render_checklist_pdf,
+)
+
+JOB_RETENTION = timedelta(hours=1)
+MAX_QUEUED_JOBS = 500
+
+# kind -> (filename, media type)
+EXPORT_KINDS = {
+    "tasks": ("tasks.csv", "text/csv"),
+    "budget": ("budget.pdf", "application/pdf"),
+    "checklist": ("checklist.pdf", "application/pdf"),
+}
+
+# `worker` is the pid of the process whose queue holds the job
+JOB_FIELDS = [
+    "id", "user_id", "kind", "status", "error", "created_at", "finished_at", "worker"
+]
+UNFINISHED = ("queued", "running")
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore(ABC):
+    """
+    Where export jobs and their output live. Jobs are dicts with the
+    JOB_FIELDS keys; content is stored separately so status polls don't
+    drag the file along.
+
+    Calls block, so ExportJobQueue runs them on a thread.
+    """
+
+    @abstractmethod
+    def create(self, job: dict) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, **fields) -> None:
+        ...
+
+    @abstractmethod
+    def set_content(self, job_id: str, content: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def get_content(self, job_id: str) -> bytes | None:
+        ...
+
+    @abstractmethod
+    def purge(self, before: datetime) -> None:
+        ...
+
+    @abstractmethod
+    def unfinished(self) -> list[dict]:
+        """Jobs still queued or running."""
+
+
+class InMemoryJobStore(JobStore):
+    def __init__(self):
+        self._jobs: dict[str, dict] = {}
+        self._content: dict[str, bytes] = {}
+
+    def create(self, job: dict) -> None:
+        self._jobs[job["id"]] = dict(job)
+
+    def get(self, job_id: str) -> dict | None:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    def update(self, job_id: str, **fields) -> None:
+        if job_id in self._jobs:
+            self._jobs[job_id].update(fields)
+
+    def set_content(self, job_id: str, content: bytes) -> None:
+        self._content[job_id] = content
+
+    def get_content(self, job_id: str) -> bytes | None:
+        return self._content.get(job_id)
+
+    def purge(self, before: datetime) -> None:
+        cutoff = before.isoformat()
+
+        for job_id in [j for j, job in self._jobs.items() if job["created_at"] < cutoff]:
+            self._jobs.pop(job_id, None)
+            self._content.pop(job_id, None)
+
+    def unfinished(self) -> list[dict]:
+        return [dict(job) for job in self._jobs.values() if job["status"] in UNFINISHED]
+
+
+class SQLiteJobStore(JobStore):
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+
+        # several workers share the file; WAL lets their reads and
+        # writes overlap
+        self._conn.execute("pragma journal_mode=wal")
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                create table if not exists export_jobs (
+                    id text primary key,
+                    user_id text not null,
+                    kind text not null,
+                    status text not null,
+                    error text,
+                    created_at text not null,
+                    finished_at text,
+                    worker integer,
+                    content blob
+                )
+                """
+            )
+
+            columns = {
+                row["name"]
+                for row in self._conn.execute("pragma table_info(export_jobs)")
+            }
+            if "worker" not in columns:
+                self._conn.execute("alter table export_jobs add column worker integer")
+
+    def create(self, job: dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"insert into export_jobs ({','.join(JOB_FIELDS)}) "
+                f"values ({','.join('?' for _ in JOB_FIELDS)})",
+                [job.get(f) for f in JOB_FIELDS]
+            )
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"select {','.join(JOB_FIELDS)} from export_jobs where id = ?",
+                (job_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def update(self, job_id: str, **fields) -> None:
+        columns = [f for f in fields if f in JOB_FIELDS]
+        if not columns:
+            return
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"update export_jobs set {', '.join(f'{c} = ?' for c in columns)} "
+                f"where id = ?",
+                [fields[c] for c in columns] + [job_id]
+            )
+
+    def set_content(self, job_id: str, content: bytes) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "update export_jobs set content = ? where id = ?",
+                (content, job_id)
+            )
+
+    def get_content(self, job_id: str) -> bytes | None:
+        with self._lock:
+            row = self._conn.execute(
+                "select content from export_jobs where id = ?",
+                (job_id,)
+            ).fetchone()
+        return row["content"] if row else None
+
+    def purge(self, before: datetime) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "delete from export_jobs where created_at < ?",
+                (before.isoformat(),)
+            )
+
+    def unfinished(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"select {','.join(JOB_FIELDS)} from export_jobs "
+                f"where status in ({','.join('?' for _ in UNFINISHED)})",
+                UNFINISHED
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def create_job_store(spec: str) -> JobStore:
+    if spec == "memory":
+        return InMemoryJobStore()
+    if spec.startswith("sqlite:"):
+        return SQLiteJobStore(spec.removeprefix("sqlite:"))
+    raise ValueError(f"Unknown export job store: {spec}")
+
+
+def _tasks_csv(user_id: str) -> bytes:
+    return "".join(
+        iter_tasks_csv(user_id, ["title", "status", "created_at"])
+    ).encode()
+
+
+class ExportJobQueue:
+    """
+    Runs exports off the request path.
+
+    enqueue() records a job and returns straight away; `workers`
+    coroutines pull jobs off a bounded queue, fetch the source rows on a
+    thread and hand PDF rendering to a process pool, since reportlab is
+    CPU-bound and would otherwise hold the GIL. Store calls run on a
+    thread too, so a slow or busy store never blocks the event loop.
+
+    The queue itself lives in this process. Jobs left unfinished by a
+    process that has gone away (a restarted worker) can never run, so
+    they're marked failed on start() and whenever a job is enqueued.
+    """
+
+    def __init__(self, store: JobStore, workers: int = 2):
+        self.store = store
+        self.workers = workers
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._pool: ProcessPoolExecutor | None = None
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+
+        # nothing is in our queue yet, so our own pid's jobs are stale too
+        await asyncio.to_thread(self._fail_orphans, True)
+
+        self._queue = asyncio.Queue(maxsize=MAX_QUEUED_JOBS)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._tasks = [
+            asyncio.create_task(self._worker())
+            for _ in range(self.workers)
+        ]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _fail_orphans(self, include_own: bool = False) -> None:
+        pid = os.getpid()
+
+        for job in self.store.unfinished():
+            worker = job.get("worker")
+
+            if worker is None or (worker == pid and include_own) or (
+                worker != pid and not _alive(worker)
+            ):
+                self.store.update(
+                    job["id"],
+                    status="failed",
+                    error="Export worker restarted; please try again",
+                    finished_at=datetime.utcnow().isoformat()
+                )
+
+    def _housekeep(self, now: datetime) -> None:
+        self.store.purge(now - JOB_RETENTION)
+        self._fail_orphans()
+
+    async def get(self, job_id: str) -> dict | None:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def get_content(self, job_id: str) -> bytes | None:
+        return await asyncio.to_thread(self.store.get_content, job_id)
+
+    async def enqueue(self, user_id: str, kind: str) -> dict:
+        if kind not in EXPORT_KINDS:
+            raise ValueError(f"Unknown export kind: {kind}")
+        if self._queue is None:
+            raise RuntimeError("Export job queue not started")
+
+        now = datetime.utcnow()
+        await asyncio.to_thread(self._housekeep, now)
+
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "kind": kind,
+            "status": "queued",
+            "error": None,
+            "created_at": now.isoformat(),
+            "finished_at": None,
+            "worker": os.getpid()
+        }
+
+        if self._queue.full():
+            raise QueueFull("Too many exports queued")
+
+        # recorded before it's queued so a worker always finds it
+        await asyncio.to_thread(self.store.create, job)
+        self._queue.put_nowait(job["id"])
+        return job
+
+    async def _render(self, job: dict) -> bytes:
+        loop = asyncio.get_running_loop()
+        user_id = job["user_id"]
+
+        if job["kind"] == "tasks":
+            return await asyncio.to_thread(_tasks_csv, user_id)
+
+        if job["kind"] == "budget":
+            rows = await asyncio.to_thread(fetch_budget_rows, user_id)
+            return await loop.run_in_executor(self._pool, render_budget_pdf, rows)
+
+        rows = await asyncio.to_thread(fetch_checklist_rows, user_id)
+        return await loop.run_in_executor(self._pool, render_checklist_pdf, rows)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+
+            try:
+                job = await asyncio.to_thread(self.store.get, job_id)
+
+                if job is None or job["status"] != "queued":
+                    continue
+
+                await asyncio.to_thread(self.store.update, job_id, status="running")
+
+                content = await self._render(job)
+                await asyncio.to_thread(self.store.set_content, job_id, content)
+                await asyncio.to_thread(
+                    self.store.update,
+                    job_id,
+                    status="done",
+                    finished_at=datetime.utcnow().isoformat()
+                )
+            except Exception as e:
+                print("EXPORT JOB ERROR:", e)
+
+                try:
+                    await asyncio.to_thread(
+                        self.store.update,
+                        job_id,
+                        status="failed",
+                        error=str(e),
+                        finished_at=datetime.utcnow().isoformat()
+                    )
+                except Exception as e:
+                    print("EXPORT JOB ERROR:", e)
+
+
+export_jobs = ExportJobQueue(create_job_store(EXPORT_JOB_STORE), EXPORT_WORKERS)
@@ -1,44 +1,131 @@
-from io import BytesIO
-from typing import List
-import pandas as pd
-from fastapi.responses import StreamingResponse
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+import csv
+import hashlib
+import json
+from io import BytesIO, StringIO
+from typing import Iterator
+from fastapi.responses import Response, StreamingResponse
+from app.cache import TTLCache
 from app.db import supabase
 
+CSV_PAGE_SIZE = 1000
 
-def export_tasks_csv(user_id: str) -> StreamingResponse:
-    response = (
-        supabase
-        .table("tasks")
-        .select("title,status,created_at")
-        .eq("user_id", user_id)
-        .execute()
-    )
 
-    df = pd.DataFrame(response.data)
+def iter_task_pages(
+    user_id: str | None,
+    columns: list[str],
+    page_size: int = CSV_PAGE_SIZE
+) -> Iterator[list[dict]]:
+    """
+    Page through tasks ordered by (created_at, id) using keyset
+    pagination, so each page is an index range scan no matter how deep
+    into the table we are. `user_id=None` pages through every user.
+    """
+    select = ",".join(dict.fromkeys(columns + ["created_at", "id"]))
+    last = None
 
-    buffer = BytesIO()
-    df.to_csv(buffer, index=False)
-    buffer.seek(0)
+    while True:
+        query = (
+            supabase
+            .table("tasks")
+            .select(select)
+            .order("created_at")
+            .order("id")
+            .limit(page_size)
+        )
+
+        if user_id is not None:
+            query = query.eq("user_id", user_id)
+
+        if last is not None:
+            created_at, task_id = last["created_at"], last["id"]
+            query = query.or_(
+                f'created_at.gt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.gt."{task_id}")'
+            )
+
+        rows = query.execute().data
+
+        if not rows:
+            return
+
+        yield rows
+
+        if len(rows) < page_size:
+            return
+
+        last = rows[-1]
+
+
+def iter_tasks_csv(user_id: str | None, columns: list[str]) -> Iterator[str]:
+    """Yields the CSV one page of rows at a time."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(columns)
+
+    for page in iter_task_pages(user_id, columns):
+        for row in page:
+            writer.writerow([row.get(c) for c in columns])
+
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
 
+
+def export_tasks_csv(user_id: str) -> StreamingResponse:
     return StreamingResponse(
-        buffer,
+        iter_tasks_csv(user_id, ["title", "status", "created_at"]),
         media_type="text/csv",
         headers={
             "Content-Disposition": "attachment; filename=tasks.csv"
         }
     )
 
-def export_budget_pdf(user_id: str) -> StreamingResponse:
-    response = (
-        supabase
-        .table("budget_categories")
-        .select("category,allocated,spent")
-        .eq("user_id", user_id)
-        .execute()
+
+def export_all_tasks_csv() -> StreamingResponse:
+    return StreamingResponse(
+        iter_tasks_csv(None, ["user_id", "title", "status", "created_at"]),
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": "attachment; filename=all_tasks.csv"
+        }
     )
 
+# bump when the PDF layout changes so cached renders and client ETags
+# from the old layout stop matching
+PDF_LAYOUT_VERSION = 1
+
+# (kind, user_id) -> (etag, pdf bytes), bounded by total bytes
+pdf_cache = TTLCache(maxsize=64 * 1024 * 1024, ttl=24 * 3600, weigh=lambda v: len(v[1]))
+
+
+def content_etag(kind: str, rows: list[dict]) -> str:
+    payload = json.dumps([kind, PDF_LAYOUT_VERSION, rows], sort_keys=True, default=str)
+    return '"' + hashlib.sha256(payload.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    candidates = [
+        tag.strip().removeprefix("W/")
+        for tag in if_none_match.split(",")
+    ]
+    return etag in candidates
+
+
+def render_budget_pdf(rows: list[dict]) -> bytes:
+    # reportlab is imported on first use so it isn't loaded into every
+    # worker at startup; exports are a tiny share of traffic
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
     buffer = BytesIO()
     pdf = canvas.Canvas(buffer, pagesize=A4)
     width, height = A4
@@ -49,7 +136,7 @@ def export_budget_pdf(user_id: str) -> StreamingResponse:
     y = height - 80
     pdf.setFont("Helvetica", 11)
 
-    for row in response.data:
+    for row in rows:
         pdf.drawString(
             40,
             y,
@@ -62,25 +149,12 @@ def export_budget_pdf(user_id: str) -> StreamingResponse:
             y = height - 40
 
     pdf.save()
-    buffer.seek(0)
+    return buffer.getvalue()
 
-    return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": "attachment; filename=budget.pdf"
-        }
-    )
 
-
-def export_checklist_pdf(user_id: str) -> StreamingResponse:
-    response = (
-        supabase
-        .table("tasks")
-        .select("title,status")
-        .eq("user_id", user_id)
-        .execute()
-    )
+def render_checklist_pdf(rows: list[dict]) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
 
     buffer = BytesIO()
     pdf = canvas.Canvas(buffer, pagesize=A4)
@@ -92,7 +166,7 @@ def export_checklist_pdf(user_id: str) -> StreamingResponse:
     y = height - 80
     pdf.setFont("Helvetica", 11)
 
-    for task in response.data:
+    for task in rows:
         status = "✓" if task["status"] == "completed" else "☐"
         pdf.drawString(40, y, f"{status} {task['title']}")
         y -= 18
@@ -102,12 +176,90 @@ def export_checklist_pdf(user_id: str) -> StreamingResponse:
             y = height - 40
 
     pdf.save()
-    buffer.seek(0)
+    return buffer.getvalue()
 
-    return StreamingResponse(
-        buffer,
+
+def cached_pdf_response(
+    kind: str,
+    user_id: str,
+    rows: list[dict],
+    render,
+    filename: str,
+    if_none_match: str | None
+) -> Response:
+    """
+    Serve a PDF built from `rows`, re-rendering only when they change.
+
+    The ETag is a hash of the source rows, so an unchanged document
+    costs the source query plus a hash: a 304 if the client already has
+    it, otherwise the cached bytes.
+    """
+    etag = content_etag(kind, rows)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache"
+    }
+
+    if etag_matches(etag, if_none_match):
+        return Response(status_code=304, headers=headers)
+
+    cached = pdf_cache.get((kind, user_id))
+
+    if cached and cached[0] == etag:
+        content = cached[1]
+    else:
+        content = render(rows)
+        pdf_cache.set((kind, user_id), (etag, content))
+
+    headers["Content-Disposition"] = f"attachment; filename={filename}"
+
+    return Response(
+        content=content,
         media_type="application/pdf",
-        headers={
-            "Content-Disposition": "attachment; filename=checklist.pdf"
-        }
+        headers=headers
+    )
+
+
+def fetch_budget_rows(user_id: str) -> list[dict]:
+    return (
+        supabase
+        .table("budget_categories")
+        .select("category,allocated,spent")
+        .eq("user_id", user_id)
+        .order("category")
+        .execute()
+    ).data
+
+
+def fetch_checklist_rows(user_id: str) -> list[dict]:
+    return (
+        supabase
+        .table("tasks")
+        .select("title,status")
+        .eq("user_id", user_id)
+        .order("created_at")
+        .order("id")
+        .execute()
+    ).data
+
+
+def export_budget_pdf(user_id: str, if_none_match: str | None = None) -> Response:
+    return cached_pdf_response(
+        "budget",
+        user_id,
+        fetch_budget_rows(user_id),
+        render_budget_pdf,
+        "budget.pdf",
+        if_none_match
+    )
+
+
+def export_checklist_pdf(user_id: str, if_none_match: str | None = None) -> Response:
+    return cached_pdf_response(
+        "checklist",
+        user_id,
+        fetch_checklist_rows(user_id),
+        render_checklist_pdf,
+        "checklist.pdf",
+        if_none_match
     )
@@ -1,14 +1,26 @@
-from app.db import supabase
+from app.db import get_async_supabase
+from app.profiles import PROFILE_COLUMNS, get_profile, invalidate_profile
+from app.events import publish_change
 
 
-def update_user_detail(user_id: str, field: str, value):
-    supabase.table("users").update({
+async def update_user_detail(user_id: str, field: str, value):
+    supabase = get_async_supabase()
+
+    await supabase.table("users").update({
         field: value
     }).eq("id", user_id).execute()
+    invalidate_profile(user_id)
+    await publish_change(user_id, "users")
+
+
+async def get_user_detail(user_id: str, field: str):
+    if field in PROFILE_COLUMNS:
+        profile = await get_profile(user_id, fresh=True)
+        return profile.get(field) if profile else None
 
+    supabase = get_async_supabase()
 
-def get_user_detail(user_id: str, field: str):
-    response = (
+    response = await (
         supabase
         .table("users")
         .select(field)
@@ -18,16 +30,10 @@ def get_user_detail(user_id: str, field: str):
     )
     return response.data.get(field)
 
-def get_all_user_details(user_id: str) -> dict:
-    response = (
-        supabase
-        .table("users")
-        .select(
-            "style, budget, guest_count, venue, wedding_date, celebrant"
-        )
-        .eq("id", user_id)
-        .single()
-        .execute()
-    )
-    return response.data
+async def get_all_user_details(user_id: str) -> dict:
+    profile = await get_profile(user_id, fresh=True) or {}
 
+    return {
+        field: profile.get(field)
+        for field in ("style", "budget", "guest_count", "venue", "wedding_date", "celebrant")
+    }
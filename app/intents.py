@@ -0,0 +1,146 @@
+"""
+Keyword pre-router for canned chat intents that skip the LLM.
+
+An intent is a list of keyword groups, and it matches when the message
+hits at least one keyword from every group: stress needs any one stress
+word, create_checklist needs a "create" word and a "checklist" word.
+A trailing "*" makes a keyword match any word it starts ("overwhelm*"
+hits "overwhelmed" and "overwhelming"). Stress words are spelled out
+instead, since "stress*" would also catch planning questions like
+"stress-free wedding ideas" or "what's the most stressful part".
+
+Every keyword of every intent is compiled into one regex shaped like a
+trie, so each position in the message only follows the branch for its
+next character. A message is scanned once however many keywords there
+are, which keeps routing O(message length) as intents are added.
+
+Rules can be replaced without a code change by pointing
+INTENT_RULES_PATH at a JSON file of the same shape as
+DEFAULT_INTENT_RULES.
+"""
+from collections import defaultdict
+import json
+import re
+
+from app.config import INTENT_RULES_PATH
+
+# intent -> keyword groups, in priority order
+DEFAULT_INTENT_RULES = {
+    "stress": [[
+        "stressed", "stressing", "overwhelm*", "anxious", "anxiety", "panic*",
+        "too much", "cant handle", "cant cope", "tired", "exhausted",
+        "burnt out", "burned out", "freaking out"
+    ]],
+    "create_checklist": [
+        ["create"],
+        ["checklist*"]
+    ],
+}
+
+_APOSTROPHES = re.compile(r"['’‘`]")
+_SEPARATORS = re.compile(r"[\W_]+")
+
+_END = ""
+
+
+def normalize(text: str) -> str:
+    """Casefold, drop apostrophes ("can't" -> "cant") and collapse punctuation to single spaces."""
+    text = _APOSTROPHES.sub("", text.casefold())
+    return _SEPARATORS.sub(" ", text).strip()
+
+
+def _trie_pattern(node: dict) -> str:
+    branches = [
+        re.escape(ch) + _trie_pattern(child)
+        for ch, child in sorted(node.items())
+        if ch != _END
+    ]
+    end = node.get(_END)
+
+    if end == "prefix":
+        # longer keywords first, then the rest of the word
+        return "(?:" + "|".join(branches + [r"\w*"]) + ")"
+
+    if not branches:
+        return ""
+
+    if end == "exact":
+        return "(?:" + "|".join(branches) + ")?"
+    if len(branches) == 1:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")"
+
+
+class IntentRouter:
+    def __init__(self, rules: dict[str, list[list[str]]]):
+        self.intents = list(rules)
+        self._groups = {intent: len(groups) for intent, groups in rules.items()}
+
+        # keyword -> [(intent, group index)]
+        self._exact: dict[str, list] = defaultdict(list)
+        self._prefix: dict[str, list] = defaultdict(list)
+        trie: dict = {}
+
+        for intent, groups in rules.items():
+            for index, keywords in enumerate(groups):
+                for keyword in keywords:
+                    is_prefix = keyword.endswith("*")
+                    word = normalize(keyword.rstrip("*"))
+
+                    if not word:
+                        raise ValueError(f"Empty keyword in intent {intent}")
+
+                    target = self._prefix if is_prefix else self._exact
+                    target[word].append((intent, index))
+
+                    node = trie
+                    for ch in word:
+                        node = node.setdefault(ch, {})
+
+                    if node.get(_END) != "prefix":
+                        node[_END] = "prefix" if is_prefix else "exact"
+
+        self._pattern = re.compile(r"\b" + _trie_pattern(trie) + r"\b")
+
+    def _hits(self, found: str) -> list:
+        hits = list(self._exact.get(found, ()))
+
+        for end in range(len(found), 0, -1):
+            hits.extend(self._prefix.get(found[:end], ()))
+
+        return hits
+
+    def matches(self, message: str) -> list[str]:
+        """Every intent the message satisfies, in priority order."""
+        seen = defaultdict(set)
+
+        for match in self._pattern.finditer(normalize(message)):
+            for intent, index in self._hits(match.group()):
+                seen[intent].add(index)
+
+        return [
+            intent for intent in self.intents
+            if len(seen[intent]) == self._groups[intent]
+        ]
+
+    def match(self, message: str) -> str | None:
+        """The highest-priority intent the message satisfies, if any."""
+        matched = self.matches(message)
+        return matched[0] if matched else None
+
+
+def load_intent_router(path: str | None) -> IntentRouter:
+    if not path:
+        return IntentRouter(DEFAULT_INTENT_RULES)
+
+    with open(path) as f:
+        rules = json.load(f)
+
+    # a bare keyword list is shorthand for a single group
+    return IntentRouter({
+        intent: [groups] if groups and isinstance(groups[0], str) else groups
+        for intent, groups in rules.items()
+    })
+
+
+intent_router = load_intent_router(INTENT_RULES_PATH)
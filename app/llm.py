@@ -0,0 +1,36 @@
+import aiohttp
+import openai
+
+from app.config import OPENAI_API_KEY
+
+openai.api_key = OPENAI_API_KEY
+
+_session: aiohttp.ClientSession | None = None
+
+
+async def open_session() -> None:
+    global _session
+    _session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=100)
+    )
+
+
+async def close_session() -> None:
+    global _session
+
+    if _session is not None:
+        await _session.close()
+    _session = None
+
+
+async def chat_completion(**kwargs):
+    """
+    Async ChatCompletion call over the worker's pooled aiohttp session.
+
+    openai.aiosession is a ContextVar, so it is set here (inside the
+    request's task) rather than once at startup.
+    """
+    if _session is not None:
+        openai.aiosession.set(_session)
+
+    return await openai.ChatCompletion.acreate(**kwargs)
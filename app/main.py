@@ -1,84 +1,112 @@
-from fastapi import FastAPI, Request, HTTPException, Depends
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, HTTPException, Depends, Query
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-import openai
 import json
+import time
 from datetime import datetime
-import httpx
 
-from app.config import OPENAI_API_KEY, SUPABASE_SERVICE_KEY, SUPABASE_URL
-from app.db import supabase
-from app.memory import get_conversation, save_message
-from app.functions import update_user_detail, get_user_detail
-from app.prompts import SYSTEM_PROMPT
+from app.audit import audit_log
+from app.auth import authenticate
+from app.checklist_cache import checklist_cache
+from app.db import get_async_supabase, open_async_clients, close_async_clients
+from app.events import broker, publish_change
+from app.llm import chat_completion, open_session, close_session
+from app.profiles import profile_cache, get_profile, invalidate_profile, start_request_scope
+from app.memory import conversation_store, get_conversation, save_exchange
+from app.summaries import conversation_summarizer
+from app.context import (
+    build_context,
+    build_generic_context,
+    load_encoding,
+    prompt_token_stats
+)
+from app.functions import update_user_detail, get_user_detail, get_all_user_details
+from app.intents import intent_router
+from app.profile_answers import answer_profile_question, profile_answer_stats
+from app.response_cache import response_cache
+from app.scheduling import plan_schedule
+from app.wellness import wellness_library
+from app.sync import (
+    get_change_feed,
+    InvalidCursor,
+    CursorExpired,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE
+)
 
 from app.planning import (
     complete_task,
-    get_tasks,
+    get_or_create_tasks,
     create_ai_checklist,
     create_default_timeline,
     create_budget_breakdown
 )
 
+from app.export_jobs import export_jobs, EXPORT_KINDS, QueueFull
 from app.exports import (
+    pdf_cache,
     export_tasks_csv,
+    export_all_tasks_csv,
     export_budget_pdf,
     export_checklist_pdf
 )
 
-openai.api_key = OPENAI_API_KEY
-app = FastAPI(title="WedBot")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_async_clients()
+    await open_session()
+    await asyncio.to_thread(load_encoding)
+    await conversation_store.start()
+    await conversation_summarizer.start()
+    await export_jobs.start()
+    await audit_log.start()
+    await wellness_library.start()
+    yield
+    await wellness_library.close()
+    await audit_log.close()
+    await export_jobs.close()
+    await conversation_summarizer.close()
+    await conversation_store.close()
+    await close_session()
+    await close_async_clients()
+
+
+app = FastAPI(title="WedBot", lifespan=lifespan)
 
 security = HTTPBearer()
 
-def verify_token(
+async def verify_token(
     request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
 
     try:
-        response = httpx.get(
-            f"{SUPABASE_URL}/auth/v1/user",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "apikey": SUPABASE_SERVICE_KEY,
-            },
-            timeout=5
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        user_data = response.json()
-        user_id = user_data["id"]
-        user_email = user_data.get("email")
-
+        user_id, user_email = await authenticate(token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    db_user = (
-        supabase
-        .table("users")
-        .select("role")
-        .eq("id", user_id)
-        .single()
-        .execute()
-        .data
-    )
+    start_request_scope()
+    profile = await get_profile(user_id)
 
-    if not db_user:
+    if not profile:
         raise HTTPException(status_code=403, detail="User not found")
 
+    role = profile.get("role") or "bride"
+
     request.state.user = {
         "id": user_id,
         "email": user_email,
-        "role": db_user.get("role", "bride")
+        "role": role
     }
 
 
 def require_roles(*allowed_roles):
-    def checker(request: Request):
+    async def checker(request: Request):
         user_role = request.state.user.get("role")
 
         if user_role not in allowed_roles:
@@ -88,15 +116,29 @@ def require_roles(*allowed_roles):
             )
     return checker
 
-def generate_weekly_schedule(user_id: str):
-    user = (
-        supabase.table("users")
-        .select("wedding_date")
-        .eq("id", user_id)
-        .single()
-        .execute()
-        .data
-    )
+async def write_schedule(user_id: str, assignments: list[dict]) -> None:
+    """
+    Persist every assignment in one round-trip via the schedule_tasks
+    RPC (sql/tasks_schedule.sql).
+    """
+    if not assignments:
+        return
+
+    supabase = get_async_supabase()
+
+    await supabase.rpc("schedule_tasks", {
+        "p_user_id": user_id,
+        "p_assignments": assignments
+    }).execute()
+
+
+async def generate_weekly_schedule(
+    user_id: str,
+    dry_run: bool = False,
+    capacity: int | None = None
+) -> list[dict]:
+    supabase = get_async_supabase()
+    user = await get_profile(user_id)
 
     if not user or not user.get("wedding_date"):
         raise HTTPException(status_code=400, detail="Wedding date not set")
@@ -107,52 +149,38 @@ def generate_weekly_schedule(user_id: str):
     weeks_remaining = max(1, (wedding_date - today).days // 7)
 
     tasks = (
-        supabase.table("tasks")
-        .select("*")
+        await supabase.table("tasks")
+        .select("id,title")
         .eq("user_id", user_id)
         .eq("completed", False)
         .execute()
-        .data
-    )
-
-    if not tasks:
-        return 0
-
-    total_tasks = len(tasks)
-    tasks_per_week = max(1, total_tasks // weeks_remaining)
-
-    week_counter = 1
-    assigned = 0
+    ).data
 
-    for task in tasks:
-        supabase.table("tasks").update({
-            "scheduled_week": week_counter,
-            "updated_at": datetime.utcnow().isoformat()
-        }).eq("id", task["id"]).execute()
+    assignments = plan_schedule(tasks or [], weeks_remaining, capacity=capacity)
 
-        assigned += 1
+    if not dry_run:
+        await write_schedule(user_id, assignments)
+        await publish_change(user_id, "tasks")
 
-        if assigned % tasks_per_week == 0 and week_counter < weeks_remaining:
-            week_counter += 1
+    return assignments
 
-    return assigned
 
-
-def log_audit_event(
+async def log_audit_event(
     user_id: str,
     action_type: str,
     old_value,
     new_value,
     changed_by: str
 ):
-    supabase.table("audit_logs").insert({
+    # queued; app.audit batches the inserts in the background
+    await audit_log.log({
         "user_id": user_id,
         "action_type": action_type,
         "old_value": old_value,
         "new_value": new_value,
         "changed_by": changed_by,
         "created_at": datetime.utcnow().isoformat()
-    }).execute()
+    })
 
 
 
@@ -165,12 +193,45 @@ class PortalMockUpdateRequest(BaseModel):
     value: str
 
 
+@app.get("/metrics/cache")
+async def cache_metrics(
+    _: None = Depends(verify_token)
+):
+    return {
+        "profile": profile_cache.stats(),
+        "checklist": checklist_cache.stats(),
+        "pdf": pdf_cache.stats(),
+        "wellness": wellness_library.stats(),
+        "profile_answers": profile_answer_stats.stats(),
+        "prompt_tokens": prompt_token_stats.stats(),
+        "responses": response_cache.stats()
+    }
+
+
+async def timed(name: str, query, timings: dict):
+    """Await a query, recording its duration in ms under `name`."""
+    start = time.perf_counter()
+    try:
+        return (await query.execute()).data
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000
+
+
+def server_timing(timings: dict) -> str:
+    return ", ".join(
+        f"{name};dur={duration:.1f}"
+        for name, duration in timings.items()
+    )
+
+
 @app.get("/sync/changes")
-def get_changes(
+async def get_changes(
     since: str,
     request: Request,
+    response: Response,
     _: None = Depends(verify_token)
 ):
+    supabase = get_async_supabase()
     user_id = request.state.user["id"]
 
     try:
@@ -178,32 +239,37 @@ def get_changes(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid timestamp format")
 
-    user_changes = (
-        supabase.table("users")
-        .select("*")
-        .eq("id", user_id)
-        .gt("updated_at", since)
-        .execute()
-        .data
-    )
-
-    task_changes = (
-        supabase.table("tasks")
-        .select("*")
-        .eq("user_id", user_id)
-        .gt("updated_at", since)
-        .execute()
-        .data
+    timings = {}
+
+    # the three reads are independent, so run them concurrently
+    user_changes, task_changes, budget_changes = await asyncio.gather(
+        timed(
+            "users",
+            supabase.table("users")
+            .select("*")
+            .eq("id", user_id)
+            .gt("updated_at", since),
+            timings
+        ),
+        timed(
+            "tasks",
+            supabase.table("tasks")
+            .select("*")
+            .eq("user_id", user_id)
+            .gt("updated_at", since),
+            timings
+        ),
+        timed(
+            "budget_categories",
+            supabase.table("budget_categories")
+            .select("*")
+            .eq("user_id", user_id)
+            .gt("updated_at", since),
+            timings
+        )
     )
 
-    budget_changes = (
-        supabase.table("budget_categories")
-        .select("*")
-        .eq("user_id", user_id)
-        .gt("updated_at", since)
-        .execute()
-        .data
-    )
+    response.headers["Server-Timing"] = server_timing(timings)
 
     return {
         "users": user_changes,
@@ -211,12 +277,80 @@ def get_changes(
         "budget_categories": budget_changes
     }
 
+@app.get("/sync/feed")
+async def sync_feed(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    _: None = Depends(verify_token)
+):
+    try:
+        return await get_change_feed(
+            request.state.user["id"],
+            cursor,
+            limit=limit,
+            fields=fields
+        )
+    except CursorExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except (InvalidCursor, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+SYNC_KEEPALIVE_SECONDS = 15
+
+
+async def stream_sync_events(user_id: str):
+    """
+    Pushes `change` events once the user's writes are visible in
+    /sync/feed (see app.events.PUSH_DELAY_SECONDS). Events only name the
+    table; clients pull the rows from /sync/feed. A `ready`
+    event is sent first so clients know to catch up on anything they
+    missed while disconnected.
+    """
+    queue = broker.subscribe(user_id)
+
+    try:
+        yield sse_event("ready", {})
+
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    queue.get(), timeout=SYNC_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                # keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+
+            yield sse_event(event["type"], event)
+    finally:
+        broker.unsubscribe(user_id, queue)
+
+
+@app.get("/sync/stream")
+async def sync_stream(
+    request: Request,
+    _: None = Depends(verify_token)
+):
+    return StreamingResponse(
+        stream_sync_events(request.state.user["id"]),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
 @app.post("/portal/mock-update")
-def portal_mock_update(
+async def portal_mock_update(
     req: PortalMockUpdateRequest,
     request: Request,
     _: None = Depends(verify_token)
 ):
+    supabase = get_async_supabase()
     user_id = request.state.user["id"]
 
     allowed_fields = {
@@ -231,21 +365,17 @@ def portal_mock_update(
     if req.field not in allowed_fields:
         raise HTTPException(status_code=400, detail="Invalid field")
 
-    old_data = (
-        supabase.table("users")
-        .select(req.field)
-        .eq("id", user_id)
-        .single()
-        .execute()
-        .data
-    )
+    profile = await get_profile(user_id) or {}
+    old_data = {req.field: profile.get(req.field)}
 
-    supabase.table("users").update({
+    await supabase.table("users").update({
         req.field: req.value,
         "updated_at": datetime.utcnow().isoformat()
     }).eq("id", user_id).execute()
+    invalidate_profile(user_id)
+    await publish_change(user_id, "users")
 
-    log_audit_event(
+    await log_audit_event(
         user_id=user_id,
         action_type=f"portal_update_{req.field}",
         old_value=old_data,
@@ -253,38 +383,27 @@ def portal_mock_update(
         changed_by="portal"
     )
 @app.get("/tasks")
-def get_or_generate_tasks(
+async def get_or_generate_tasks(
     request: Request,
     _: None = Depends(verify_token)
 ):
     user_id = request.state.user["id"]
 
-    existing = get_tasks(user_id)
-    if existing and len(existing) > 0:
-        return existing
-
-    profile_res = supabase.table("users") \
-        .select("style, budget, guest_count, wedding_date") \
-        .eq("id", user_id) \
-        .single() \
-        .execute()
-
-    user_context = profile_res.data or {}
-
-    create_ai_checklist(user_id, user_context)
-
-    return get_tasks(user_id)
+    try:
+        return await get_or_create_tasks(user_id)
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail="Checklist is still being generated")
 
 
 @app.post("/tasks/complete")
-def mark_complete(
+async def mark_complete(
     title: str,
     request: Request,
     _: None = Depends(verify_token),
     __: None = Depends(require_roles("bride", "groom"))
 ):
-    complete_task(request.state.user["id"], title)
-    log_audit_event(
+    await complete_task(request.state.user["id"], title)
+    await log_audit_event(
         user_id=request.state.user["id"],
         action_type="task_completed",
         old_value=None,
@@ -295,6 +414,9 @@ def mark_complete(
     return {"status": "ok"}
 
 
+# Export routes stay sync: PDF rendering is CPU-bound and the CSV pager
+# uses the sync client, so FastAPI running them on the threadpool is
+# what we want.
 @app.get("/export/tasks")
 def export_tasks(
     request: Request,
@@ -303,12 +425,23 @@ def export_tasks(
     return export_tasks_csv(request.state.user["id"])
 
 
+@app.get("/export/tasks/all")
+def export_all_tasks(
+    _: None = Depends(verify_token),
+    __: None = Depends(require_roles("planner"))
+):
+    return export_all_tasks_csv()
+
+
 @app.get("/export/budget")
 def export_budget(
     request: Request,
     _: None = Depends(verify_token)
 ):
-    return export_budget_pdf(request.state.user["id"])
+    return export_budget_pdf(
+        request.state.user["id"],
+        request.headers.get("if-none-match")
+    )
 
 
 @app.get("/export/checklist")
@@ -316,19 +449,87 @@ def export_checklist(
     request: Request,
     _: None = Depends(verify_token)
 ):
-    return export_checklist_pdf(request.state.user["id"])
+    return export_checklist_pdf(
+        request.state.user["id"],
+        request.headers.get("if-none-match")
+    )
+
+
+@app.post("/export/{kind}", status_code=202)
+async def enqueue_export(
+    kind: str,
+    request: Request,
+    _: None = Depends(verify_token)
+):
+    if kind not in EXPORT_KINDS:
+        raise HTTPException(status_code=404, detail="Unknown export")
+
+    try:
+        job = await export_jobs.enqueue(request.state.user["id"], kind)
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Export queue is full")
+
+    return {
+        "job_id": job["id"],
+        "status": job["status"]
+    }
+
+
+@app.get("/export/jobs/{job_id}")
+async def export_job(
+    job_id: str,
+    request: Request,
+    _: None = Depends(verify_token)
+):
+    job = await export_jobs.get(job_id)
+
+    if not job or job["user_id"] != request.state.user["id"]:
+        raise HTTPException(status_code=404, detail="Export job not found")
+
+    if job["status"] != "done":
+        return {
+            "job_id": job["id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "error": job["error"]
+        }
+
+    filename, media_type = EXPORT_KINDS[job["kind"]]
+
+    return Response(
+        content=await export_jobs.get_content(job_id),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+    )
 
 
 @app.post("/schedule/generate")
-def schedule_generate(
+async def schedule_generate(
     request: Request,
+    dry_run: bool = False,
+    capacity: int | None = Query(default=None, ge=1),
     _: None = Depends(verify_token),
     __: None = Depends(require_roles("bride", "groom"))
 ):
     user_id = request.state.user["id"]
 
-    count = generate_weekly_schedule(user_id)
-    log_audit_event(
+    assignments = await generate_weekly_schedule(
+        user_id,
+        dry_run=dry_run,
+        capacity=capacity
+    )
+    count = len(assignments)
+
+    if dry_run:
+        return {
+            "status": "dry run",
+            "tasks_scheduled": count,
+            "assignments": assignments
+        }
+
+    await log_audit_event(
         user_id=user_id,
         action_type="weekly_schedule_generated",
         old_value=None,
@@ -342,159 +543,290 @@ def schedule_generate(
     }
 
 
-STRESS_KEYWORDS = [
-    "stressed", "overwhelmed", "anxious",
-    "panic", "too much", "cant handle",
-    "tired", "exhausted"
+CHAT_FUNCTIONS = [
+    {
+        "name": "update_user_detail",
+        "description": "Update a wedding-related user detail",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "field": {"type": "string"},
+                "value": {}
+            },
+            "required": ["field", "value"]
+        }
+    },
+    {
+        "name": "get_user_detail",
+        "description": "Get a wedding-related user detail",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "field": {"type": "string"}
+            },
+            "required": ["field"]
+        }
+    }
 ]
 
+FALLBACK_REPLY = "I’m not sure how to help with that."
+ERROR_REPLY = "Something went wrong. Please try again."
 
-def get_random_wellness_content(content_type: str):
-    result = (
-        supabase
-        .table("wellness_content")
-        .select("title, content")
-        .eq("type", content_type)
-        .limit(1)
-        .execute()
+
+async def quick_reply(user_id: str, question: str) -> str | None:
+    """
+    Canned replies that skip the LLM. Returns None when the message
+    should go to the model.
+    """
+    intent = intent_router.match(question)
+
+    if intent == "stress":
+
+        breathing = await wellness_library.pick(user_id, "breathing")
+        affirmation = await wellness_library.pick(user_id, "affirmation")
+
+        reply_parts = []
+
+        if affirmation:
+            reply_parts.append(affirmation["content"])
+
+        if breathing:
+            reply_parts.append(
+                f"\n\nTry this breathing exercise:\n"
+                f"{breathing['title']} — {breathing['content']}"
+            )
+
+        return "\n".join(reply_parts) or "Take a deep breath. You've got this."
+
+    if intent == "create_checklist":
+
+        user = await get_profile(user_id)
+
+        count = await create_ai_checklist(user_id, user)
+
+        return f"I’ve created your wedding checklist with {count} tasks."
+
+    return await answer_profile_question(user_id, question)
+
+
+async def build_chat_messages(user_id: str, message: str) -> tuple[list[dict], int]:
+    """The prompt for a chat turn and its token count (see app.context)."""
+    history, profile = await asyncio.gather(
+        get_conversation(user_id),
+        get_all_user_details(user_id)
     )
-    return result.data[0] if result.data else None
 
+    clean_history = [
+        m for m in history
+        if isinstance(m.get("content"), str)
+    ]
 
-@app.post("/chat")
-def chat(
-    req: ChatRequest,
-    request: Request,
-    _: None = Depends(verify_token),
-    __: None = Depends(require_roles("bride", "groom"))
-):
+    return build_context(message, clean_history, profile)
+
+
+def cached_reply(message: str) -> tuple[str | None, str | None]:
+    """
+    (cache key, cached reply) for a generic question; the key is None
+    when the question is personal and must skip app.response_cache.
+    """
+    key = response_cache.cache_key(message)
+    return key, response_cache.get(key) if key else None
+
+
+async def completion_args(
+    user_id: str,
+    message: str,
+    cache_key: str | None
+) -> tuple[dict, int]:
+    """
+    chat_completion arguments and the prompt-token count. Cacheable
+    questions get the generic prompt and no functions, so the reply can
+    be shared between users.
+    """
+    if cache_key:
+        messages, prompt_tokens = build_generic_context(message)
+        return {"messages": messages}, prompt_tokens
+
+    messages, prompt_tokens = await build_chat_messages(user_id, message)
+
+    return {
+        "messages": messages,
+        "functions": CHAT_FUNCTIONS,
+        "function_call": "auto"
+    }, prompt_tokens
+
+
+async def run_function_call(user_id: str, fn_name: str, args: dict) -> str:
+    if fn_name == "update_user_detail":
+        await update_user_detail(
+            user_id=user_id,
+            field=args["field"],
+            value=args["value"]
+        )
+        return f"Updated your {args['field']} successfully."
+
+    if fn_name == "get_user_detail":
+        value = await get_user_detail(
+            user_id=user_id,
+            field=args["field"]
+        )
+        return f"Your {args['field']} is {value}."
+
+    return FALLBACK_REPLY
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_chat(user_id: str, message: str):
+    """
+    Yields the reply as SSE `token` events while the model is still
+    generating, then a final `done` event with the full reply.
+
+    function_call deltas arrive as a name followed by argument
+    fragments; they're buffered and the call is run once the stream
+    ends. The exchange is only saved after the stream completes, so a
+    client that disconnects mid-reply leaves no half-written turn.
+    """
     try:
-        user_id = request.state.user["id"]
-        question = req.message.lower()
+        reply = await quick_reply(user_id, message.lower())
+        done = {}
+        cache_key = None
+
+        if reply is None:
+            cache_key, reply = cached_reply(message)
+
+        if reply is None:
+            kwargs, prompt_tokens = await completion_args(user_id, message, cache_key)
+            done["prompt_tokens"] = prompt_tokens
 
-        if any(keyword in question for keyword in STRESS_KEYWORDS):
+            response = await chat_completion(
+                model="gpt-4o-mini",
+                stream=True,
+                **kwargs
+            )
+
+            parts = []
+            fn_name = None
+            fn_args = []
 
-            breathing = get_random_wellness_content("breathing")
-            affirmation = get_random_wellness_content("affirmation")
+            async for chunk in response:
+                delta = chunk.choices[0].delta
 
-            reply_parts = []
+                if delta.get("function_call"):
+                    fn_name = delta["function_call"].get("name") or fn_name
+                    fn_args.append(delta["function_call"].get("arguments") or "")
 
-            if affirmation:
-                reply_parts.append(affirmation["content"])
+                elif delta.get("content"):
+                    parts.append(delta["content"])
+                    yield sse_event("token", {"content": delta["content"]})
 
-            if breathing:
-                reply_parts.append(
-                    f"\n\nTry this breathing exercise:\n"
-                    f"{breathing['title']} — {breathing['content']}"
+            if fn_name:
+                reply = await run_function_call(
+                    user_id, fn_name, json.loads("".join(fn_args))
                 )
+            else:
+                reply = "".join(parts) or FALLBACK_REPLY
 
-            reply = "\n".join(reply_parts) or "Take a deep breath. You've got this."
+                if cache_key and parts:
+                    response_cache.set(cache_key, reply)
 
-            save_message(user_id, "user", req.message)
-            save_message(user_id, "assistant", reply)
-            return {"reply": reply}
+            if fn_name or not parts:
+                yield sse_event("token", {"content": reply})
 
-      
-        if "checklist" in question and "create" in question:
+        else:
+            yield sse_event("token", {"content": reply})
 
-            user = (
-                supabase.table("users")
-                .select("style,budget,guest_count,wedding_date")
-                .eq("id", user_id)
-                .single()
-                .execute()
-                .data
-            )
+        await save_exchange(user_id, message, reply)
 
-            count = create_ai_checklist(user_id, user)
+        done["reply"] = reply
+        yield sse_event("done", done)
 
-            reply = f"I’ve created your wedding checklist with {count} tasks."
+    except Exception as e:
+        print("CHAT STREAM ERROR:", e)
+        yield sse_event("error", {"reply": ERROR_REPLY})
+
+
+def stream_chat_response(user_id: str, message: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_chat(user_id, message),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
 
-            save_message(user_id, "user", req.message)
-            save_message(user_id, "assistant", reply)
-            return {"reply": reply}
 
+@app.post("/chat/stream")
+async def chat_stream(
+    req: ChatRequest,
+    request: Request,
+    _: None = Depends(verify_token),
+    __: None = Depends(require_roles("bride", "groom"))
+):
+    return stream_chat_response(request.state.user["id"], req.message)
 
-        history = get_conversation(user_id)
 
-        clean_history = [
-            m for m in history
-            if isinstance(m.get("content"), str)
-        ]
+@app.post("/chat")
+async def chat(
+    req: ChatRequest,
+    request: Request,
+    response: Response,
+    _: None = Depends(verify_token),
+    __: None = Depends(require_roles("bride", "groom"))
+):
+    user_id = request.state.user["id"]
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return stream_chat_response(user_id, req.message)
+
+    try:
+        question = req.message.lower()
 
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-        messages.extend(clean_history)
-        messages.append({"role": "user", "content": req.message})
+        reply = await quick_reply(user_id, question)
+        cache_key = None
 
-        response = openai.ChatCompletion.create(
+        if reply is None:
+            cache_key, reply = cached_reply(req.message)
+
+        if reply is not None:
+            await save_exchange(user_id, req.message, reply)
+            return {"reply": reply}
+
+        kwargs, prompt_tokens = await completion_args(user_id, req.message, cache_key)
+        response.headers["X-Prompt-Tokens"] = str(prompt_tokens)
+
+        completion = await chat_completion(
             model="gpt-4o-mini",
-            messages=messages,
-            functions=[
-                {
-                    "name": "update_user_detail",
-                    "description": "Update a wedding-related user detail",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "field": {"type": "string"},
-                            "value": {}
-                        },
-                        "required": ["field", "value"]
-                    }
-                },
-                {
-                    "name": "get_user_detail",
-                    "description": "Get a wedding-related user detail",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "field": {"type": "string"}
-                        },
-                        "required": ["field"]
-                    }
-                }
-            ],
-            function_call="auto"
+            **kwargs
         )
 
-        msg = response.choices[0].message
+        msg = completion.choices[0].message
+
 
-  
         if msg.get("function_call"):
 
             fn_name = msg["function_call"]["name"]
             args = json.loads(msg["function_call"]["arguments"])
 
-            if fn_name == "update_user_detail":
-                update_user_detail(
-                    user_id=user_id,
-                    field=args["field"],
-                    value=args["value"]
-                )
-                reply = f"Updated your {args['field']} successfully."
-
-            elif fn_name == "get_user_detail":
-                value = get_user_detail(
-                    user_id=user_id,
-                    field=args["field"]
-                )
-                reply = f"Your {args['field']} is {value}."
-
-            else:
-                reply = "I’m not sure how to help with that."
+            reply = await run_function_call(user_id, fn_name, args)
 
         else:
-            reply = msg.get("content") or "I’m not sure how to help with that."
+            reply = msg.get("content") or FALLBACK_REPLY
+
+            if cache_key and msg.get("content"):
+                response_cache.set(cache_key, reply)
 
 
         if not isinstance(reply, str):
             reply = str(reply)
 
-        save_message(user_id, "user", req.message)
-        save_message(user_id, "assistant", reply)
+        await save_exchange(user_id, req.message, reply)
 
         return {"reply": reply}
 
     except Exception as e:
         print("CHAT ERROR:", e)
-        return {"reply": "Something went wrong. Please try again."}
+        return {"reply": ERROR_REPLY}
@@ -1,53 +1,270 @@
-from app.db import supabase
+from abc import ABC, abstractmethod
+import asyncio
+from collections import OrderedDict, deque
+import time
 
+from app.config import CONVERSATION_STORE
+from app.db import get_async_supabase
+from app.summaries import conversation_summarizer, get_summary
+
+# Must match p_max_turns in sql/conversation_buffer.sql
 MAX_TURNS = 10
 
 
-def get_conversation(user_id: str) -> list[dict]:
-    response = (
-        supabase
-        .table("conversation_buffer")
-        .select("role,message")
-        .eq("user_id", user_id)
-        .order("created_at")
-        .limit(MAX_TURNS)
-        .execute()
-    )
+class ConversationStore(ABC):
+    """
+    Where conversation history lives. Messages are handed in as
+    (role, message) pairs and come back in OpenAI chat format, plus the
+    conversation_buffer seq each one has (or will have once flushed).
+    """
+
+    @abstractmethod
+    async def get(self, user_id: str) -> list[dict]:
+        ...
+
+    @abstractmethod
+    async def append(self, user_id: str, messages: list[tuple[str, str]]) -> None:
+        ...
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class SupabaseConversationStore(ConversationStore):
+    """Reads and writes conversation_buffer directly."""
+
+    async def get(self, user_id: str) -> list[dict]:
+        supabase = get_async_supabase()
+
+        # newest MAX_TURNS rows, flipped back into chronological order
+        response = await (
+            supabase
+            .table("conversation_buffer")
+            .select("seq,role,message")
+            .eq("user_id", user_id)
+            .order("seq", desc=True)
+            .limit(MAX_TURNS)
+            .execute()
+        )
+
+        history = []
+
+        for row in reversed(response.data or []):
+            history.append({
+                "seq": row["seq"],
+                "role": row["role"],
+                "content": row["message"]
+            })
+
+        return history
+
+    async def append(self, user_id: str, messages: list[tuple[str, str]]) -> None:
+        """
+        Append to the user's ring buffer in a single RPC. The oldest
+        slots are overwritten in place, so there's no separate trim step.
+        """
+        supabase = get_async_supabase()
+
+        await supabase.rpc("append_conversation", {
+            "p_user_id": user_id,
+            "p_messages": [
+                {"role": role, "message": message or ""}
+                for role, message in messages
+            ],
+            "p_max_turns": MAX_TURNS
+        }).execute()
+
+
+def _extend(history: deque, messages: list[tuple[str, str]]) -> None:
+    # append_conversation numbers a user's messages consecutively, so the
+    # seq an unflushed message will get follows from the newest one we have
+    seq = history[-1]["seq"] if history else 0
+
+    for role, message in messages:
+        seq += 1
+        history.append({"seq": seq, "role": role, "content": message or ""})
+
+
+class InMemoryConversationStore(ConversationStore):
+    """
+    Write-behind cache in front of another store.
+
+    Recent history for active users is kept in a per-user deque, with
+    idle users evicted LRU-first. Appends land in memory immediately and
+    are flushed to `persist` by a background task, either every
+    `flush_interval` seconds or as soon as `flush_batch` messages are
+    waiting. Until start() is called, appends are written through.
+
+    Cached history isn't re-read while the user stays active, and the
+    seq of unflushed messages is predicted locally. Both are only right
+    if this worker handles all of the user's turns, so this store needs
+    a single worker or sticky routing (see CONVERSATION_STORE).
+    """
+
+    def __init__(
+        self,
+        persist: ConversationStore,
+        max_users: int = 5000,
+        idle_ttl: float = 900,
+        flush_interval: float = 1.0,
+        flush_batch: int = 200
+    ):
+        self.persist = persist
+        self.max_users = max_users
+        self.idle_ttl = idle_ttl
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+
+        self._users: OrderedDict[str, tuple[deque, float]] = OrderedDict()
+        self._pending: dict[str, list[tuple[str, str]]] = {}
+        self._pending_count = 0
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    async def get(self, user_id: str) -> list[dict]:
+        entry = self._users.get(user_id)
+
+        if entry and time.monotonic() - entry[1] < self.idle_ttl:
+            self._touch(user_id, entry[0])
+            return list(entry[0])
+
+        history = deque(await self.persist.get(user_id), maxlen=MAX_TURNS)
 
-    history = []
+        # anything not flushed yet is newer than what the DB returned
+        _extend(history, self._pending.get(user_id, []))
 
-    for row in response.data or []:
-        history.append({
-            "role": row["role"],
-            "content": row["message"] 
-        })
+        self._touch(user_id, history)
+        return list(history)
 
-    return history
+    async def append(self, user_id: str, messages: list[tuple[str, str]]) -> None:
+        if self._task is None:
+            await self.persist.append(user_id, messages)
+        else:
+            self._queue(user_id, messages)
 
+        entry = self._users.get(user_id)
 
-def save_message(user_id: str, role: str, message: str):
+        if entry:
+            _extend(entry[0], messages)
 
-    message = message or ""
+    def _touch(self, user_id: str, history: deque) -> None:
+        self._users[user_id] = (history, time.monotonic())
+        self._users.move_to_end(user_id)
 
-    supabase.table("conversation_buffer").insert({
-        "user_id": user_id,
-        "role": role,
-        "message": message 
-    }).execute()
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
 
-    rows = (
-        supabase
-        .table("conversation_buffer")
-        .select("id")
-        .eq("user_id", user_id)
-        .order("created_at", desc=True)
-        .execute()
-        .data
+    def _queue(self, user_id: str, messages: list[tuple[str, str]]) -> None:
+        pending = self._pending.setdefault(user_id, [])
+        self._pending_count -= len(pending)
+
+        # the ring buffer only keeps MAX_TURNS rows, so older unflushed
+        # messages would be overwritten anyway
+        pending.extend(messages)
+        del pending[:-MAX_TURNS]
+
+        self._pending_count += len(pending)
+
+        if self._wakeup and self._pending_count >= self.flush_batch:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        self._pending_count = 0
+
+        results = await asyncio.gather(
+            *(self.persist.append(user_id, msgs) for user_id, msgs in batch.items()),
+            return_exceptions=True
+        )
+
+        for (user_id, msgs), result in zip(batch.items(), results):
+            if isinstance(result, Exception):
+                print("CONVERSATION FLUSH ERROR:", result)
+                # retry on the next flush, ahead of anything queued since
+                self._queue(user_id, msgs + self._pending.pop(user_id, []))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+            await self.flush()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self.flush()
+
+
+def create_conversation_store(kind: str) -> ConversationStore:
+    if kind == "supabase":
+        return SupabaseConversationStore()
+    if kind == "memory":
+        return InMemoryConversationStore(SupabaseConversationStore())
+    raise ValueError(f"Unknown conversation store: {kind}")
+
+
+conversation_store = create_conversation_store(CONVERSATION_STORE)
+
+
+async def get_conversation(user_id: str) -> list[dict]:
+    """
+    Every buffered message the summary doesn't cover yet, preceded by a
+    system message with the summary once there is one. That's usually
+    the newest RECENT_TURNS messages, plus any older ones the summarizer
+    hasn't caught up with.
+    """
+    history, (summary, summarized_seq) = await asyncio.gather(
+        conversation_store.get(user_id),
+        get_summary(user_id)
     )
 
-    if len(rows) > MAX_TURNS:
-        ids_to_delete = [r["id"] for r in rows[MAX_TURNS:]]
-        supabase.table("conversation_buffer") \
-            .delete() \
-            .in_("id", ids_to_delete) \
-            .execute()
+    recent = [
+        {"role": turn["role"], "content": turn["content"]}
+        for turn in history
+        if turn["seq"] > summarized_seq
+    ]
+
+    if not summary:
+        return recent
+
+    return [
+        {"role": "system", "content": f"Summary of the earlier conversation: {summary}"},
+        *recent
+    ]
+
+
+async def save_messages(user_id: str, messages: list[tuple[str, str]]):
+    await conversation_store.append(user_id, messages)
+    conversation_summarizer.request(user_id)
+
+
+async def save_message(user_id: str, role: str, message: str):
+    await save_messages(user_id, [(role, message)])
+
+
+async def save_exchange(user_id: str, user_message: str, reply: str):
+    await save_messages(user_id, [
+        ("user", user_message),
+        ("assistant", reply)
+    ])
@@ -1,16 +1,19 @@
 from typing import List, Dict
+import asyncio
 import json
-import openai
 
-from app.db import supabase
-from app.config import OPENAI_API_KEY
+from app.db import get_async_supabase
+from app.events import publish_change
+from app.profiles import get_profile
+from app.checklist_cache import profile_bucket, get_cached_checklist, store_checklist
+from app.llm import chat_completion
 from app.prompts import CHECKLIST_PROMPT
 
-openai.api_key = OPENAI_API_KEY
+from datetime import datetime, timedelta, timezone
 
-from datetime import datetime
+async def save_tasks(user_id: str, tasks: list[dict], checklist_id: str | None = None):
+    supabase = get_async_supabase()
 
-def save_tasks(user_id: str, tasks: list[dict], checklist_id: str | None = None):
     rows = []
 
     for t in tasks:
@@ -26,10 +29,12 @@ def save_tasks(user_id: str, tasks: list[dict], checklist_id: str | None = None)
          })
 
     if rows:
-        supabase.table("tasks").insert(rows).execute()
+        await supabase.table("tasks").insert(rows).execute()
 
-def create_checklist(user_id: str, title: str, tasks: List[str]) -> str:
-    checklist = supabase.table("checklists").insert({
+async def create_checklist(user_id: str, title: str, tasks: List[str]) -> str:
+    supabase = get_async_supabase()
+
+    checklist = await supabase.table("checklists").insert({
         "user_id": user_id,
         "title": title
     }).execute()
@@ -46,36 +51,58 @@ def create_checklist(user_id: str, title: str, tasks: List[str]) -> str:
         for task in tasks
     ]
 
-    supabase.table("tasks").insert(rows).execute()
+    await supabase.table("tasks").insert(rows).execute()
     return checklist_id
 
 
-def add_task(user_id: str, title: str) -> None:
-    supabase.table("tasks").insert({
+async def add_task(user_id: str, title: str) -> None:
+    supabase = get_async_supabase()
+
+    await supabase.table("tasks").insert({
         "user_id": user_id,
         "title": title,
         "status": "pending"
     }).execute()
 
 
-def complete_task(user_id: str, title: str) -> None:
-    supabase.table("tasks") \
+async def complete_task(user_id: str, title: str) -> None:
+    supabase = get_async_supabase()
+
+    await supabase.table("tasks") \
         .update({"status": "completed"}) \
         .eq("user_id", user_id) \
         .ilike("title", f"%{title}%") \
         .execute()
 
+    await publish_change(user_id, "tasks")
+
 
-def get_tasks(user_id: str, status: str = "pending"):
-    return supabase.table("tasks") \
+async def get_tasks(user_id: str, status: str = "pending"):
+    supabase = get_async_supabase()
+
+    response = await supabase.table("tasks") \
         .select("title,status") \
         .eq("user_id", user_id) \
         .eq("status", status) \
-        .execute().data
+        .execute()
+    return response.data
 
 
-def create_ai_checklist(user_id: str, user_context: dict) -> int:
-    from app.prompts import CHECKLIST_PROMPT
+async def generate_checklist_tasks(
+    user_context: dict,
+    force_refresh: bool = False
+) -> list[str]:
+    """
+    Checklist task titles for a profile. Results are cached per profile
+    bucket (see app.checklist_cache); force_refresh skips the cache and
+    regenerates.
+    """
+    key = profile_bucket(user_context)
+
+    if not force_refresh:
+        tasks = await get_cached_checklist(key)
+        if tasks is not None:
+            return tasks
 
     prompt = CHECKLIST_PROMPT.format(
         style=user_context.get("style"),
@@ -84,7 +111,7 @@ def create_ai_checklist(user_id: str, user_context: dict) -> int:
         wedding_date=user_context.get("wedding_date"),
     )
 
-    response = openai.ChatCompletion.create(
+    response = await chat_completion(
         model="gpt-4o-mini",
         messages=[{"role": "user", "content": prompt}]
     )
@@ -99,7 +126,23 @@ def create_ai_checklist(user_id: str, user_context: dict) -> int:
     except Exception as e:
         raise ValueError(f"Checklist AI returned invalid JSON: {raw}") from e
 
-    checklist = supabase.table("checklists").insert({
+    await store_checklist(key, tasks)
+    return tasks
+
+
+async def create_ai_checklist(
+    user_id: str,
+    user_context: dict,
+    force_refresh: bool = False
+) -> int:
+    supabase = get_async_supabase()
+
+    tasks = await generate_checklist_tasks(
+        user_context or {},
+        force_refresh=force_refresh
+    )
+
+    checklist = await supabase.table("checklists").insert({
         "user_id": user_id,
         "title": "Wedding Checklist"
     }).execute()
@@ -116,11 +159,111 @@ def create_ai_checklist(user_id: str, user_context: dict) -> int:
         for task in tasks
     ]
 
-    supabase.table("tasks").insert(rows).execute()
+    await supabase.table("tasks").insert(rows).execute()
     return len(rows)
 
 
-def create_timeline(user_id: str, blocks: List[Dict[str, str]]) -> None:
+# user_id -> in-flight first-time checklist generation in this worker
+_checklist_inflight: dict[str, asyncio.Task] = {}
+
+CLAIM_TTL_SECONDS = 120
+CLAIM_POLL_SECONDS = 0.5
+
+
+async def _claim_checklist_generation(user_id: str) -> bool:
+    """
+    Cross-worker guard: only the caller that inserts the
+    checklist_generation_claims row gets to generate.
+    """
+    supabase = get_async_supabase()
+
+    claimed = await supabase.table("checklist_generation_claims").upsert(
+        {"user_id": user_id},
+        ignore_duplicates=True
+    ).execute()
+
+    if claimed.data:
+        return True
+
+    # a worker that died mid-generation leaves its claim behind
+    stale_before = (
+        datetime.now(timezone.utc) - timedelta(seconds=CLAIM_TTL_SECONDS)
+    ).isoformat()
+
+    await supabase.table("checklist_generation_claims") \
+        .delete() \
+        .eq("user_id", user_id) \
+        .lt("claimed_at", stale_before) \
+        .execute()
+
+    return False
+
+
+async def _release_checklist_claim(user_id: str) -> None:
+    supabase = get_async_supabase()
+
+    await supabase.table("checklist_generation_claims") \
+        .delete() \
+        .eq("user_id", user_id) \
+        .execute()
+
+
+async def _generate_initial_tasks(user_id: str, force_refresh: bool) -> list:
+    deadline = asyncio.get_running_loop().time() + CLAIM_TTL_SECONDS
+
+    while True:
+        existing = await get_tasks(user_id)
+        if existing:
+            return existing
+
+        if await _claim_checklist_generation(user_id):
+            try:
+                # another worker may have inserted its rows and released
+                # its claim between our get_tasks and the claim
+                existing = await get_tasks(user_id)
+                if existing:
+                    return existing
+
+                await create_ai_checklist(
+                    user_id,
+                    await get_profile(user_id) or {},
+                    force_refresh=force_refresh
+                )
+            finally:
+                await _release_checklist_claim(user_id)
+
+            return await get_tasks(user_id)
+
+        # another worker is generating; wait for its rows to show up
+        if asyncio.get_running_loop().time() > deadline:
+            raise TimeoutError("Timed out waiting for checklist generation")
+
+        await asyncio.sleep(CLAIM_POLL_SECONDS)
+
+
+async def get_or_create_tasks(user_id: str, force_refresh: bool = False) -> list:
+    """
+    Pending tasks for the user, generating the first checklist if there
+    are none. Concurrent callers for the same user share one generation:
+    in-process through _checklist_inflight, across workers through the
+    claim row.
+    """
+    existing = await get_tasks(user_id)
+    if existing:
+        return existing
+
+    task = _checklist_inflight.get(user_id)
+
+    if task is None:
+        task = asyncio.create_task(_generate_initial_tasks(user_id, force_refresh))
+        _checklist_inflight[user_id] = task
+        task.add_done_callback(lambda _: _checklist_inflight.pop(user_id, None))
+
+    # shielded so one caller disconnecting doesn't cancel it for the rest
+    return await asyncio.shield(task)
+
+
+async def create_timeline(user_id: str, blocks: List[Dict[str, str]]) -> None:
     """
     blocks example:
     [
@@ -128,9 +271,11 @@ def create_timeline(user_id: str, blocks: List[Dict[str, str]]) -> None:
       {"label": "Reception", "start": "18:00", "end": "22:00"}
     ]
     """
-    supabase.table("timelines").delete().eq("user_id", user_id).execute()
+    supabase = get_async_supabase()
 
-    supabase.table("timelines").insert([
+    await supabase.table("timelines").delete().eq("user_id", user_id).execute()
+
+    await supabase.table("timelines").insert([
         {
             "user_id": user_id,
             "label": block["label"],
@@ -140,13 +285,14 @@ def create_timeline(user_id: str, blocks: List[Dict[str, str]]) -> None:
         for block in blocks
     ]).execute()
     
-def create_default_timeline(user_id: str, style: str | None) -> int:
+async def create_default_timeline(user_id: str, style: str | None) -> int:
     """
     Creates a default wedding-day timeline based on style
     """
+    supabase = get_async_supabase()
 
     # clear existing timeline
-    supabase.table("timelines").delete().eq("user_id", user_id).execute()
+    await supabase.table("timelines").delete().eq("user_id", user_id).execute()
 
     # base timeline
     blocks = [
@@ -166,7 +312,7 @@ def create_default_timeline(user_id: str, style: str | None) -> int:
     elif style == "formal":
         blocks.append({"label": "Late night snacks", "start": "22:15", "end": "22:45"})
 
-    supabase.table("timelines").insert([
+    await supabase.table("timelines").insert([
         {
             "user_id": user_id,
             "label": b["label"],
@@ -179,7 +325,9 @@ def create_default_timeline(user_id: str, style: str | None) -> int:
     return len(blocks)
 
 
-def create_budget_breakdown(user_id: str, total_budget: float) -> None:
+async def create_budget_breakdown(user_id: str, total_budget: float) -> None:
+    supabase = get_async_supabase()
+
     breakdown = {
         "Venue": 0.4,
         "Catering": 0.3,
@@ -188,7 +336,7 @@ def create_budget_breakdown(user_id: str, total_budget: float) -> None:
         "Misc": 0.1
     }
 
-    supabase.table("budget_categories").delete().eq("user_id", user_id).execute()
+    await supabase.table("budget_categories").delete().eq("user_id", user_id).execute()
 
     rows = [
         {
@@ -200,11 +348,14 @@ def create_budget_breakdown(user_id: str, total_budget: float) -> None:
         for category, ratio in breakdown.items()
     ]
 
-    supabase.table("budget_categories").insert(rows).execute()
+    await supabase.table("budget_categories").insert(rows).execute()
+    await publish_change(user_id, "budget_categories")
+
 
+async def update_category_budget(user_id: str, category: str, amount: float) -> None:
+    supabase = get_async_supabase()
 
-def update_category_budget(user_id: str, category: str, amount: float) -> None:
-    supabase.table("budget_categories") \
+    await supabase.table("budget_categories") \
         .update({"allocated": amount}) \
         .eq("user_id", user_id) \
         .eq("category", category) \
@@ -0,0 +1,133 @@
+"""
+Answers direct profile lookups ("what's my budget?", "when is our
+wedding?") from the cached profile snapshot, before the message reaches
+the LLM.
+
+Only whole-message questions match. Anything with more to it ("how can
+I cut my budget?") still goes to the model, which has the profile
+available through get_user_detail.
+"""
+from datetime import date
+import re
+import threading
+
+from app.intents import normalize
+from app.profiles import get_profile
+
+# field -> how it's named in questions
+FIELD_ALIASES = {
+    "budget": ["budget", "wedding budget", "total budget"],
+    "wedding_date": ["wedding date", "wedding day"],
+    "guest_count": ["guest count", "number of guests", "guest number"],
+    "venue": ["venue", "wedding venue", "reception venue"],
+    "style": ["style", "wedding style", "theme", "wedding theme"],
+    "celebrant": ["celebrant", "officiant"],
+}
+
+FIELD_LABELS = {
+    "budget": "budget",
+    "wedding_date": "wedding date",
+    "guest_count": "guest count",
+    "venue": "venue",
+    "style": "wedding style",
+    "celebrant": "celebrant",
+}
+
+# extra phrasings that don't fit "<lead> my <alias>"
+FIELD_QUESTIONS = {
+    "wedding_date": [r"(?:when is|whens) (?:my|our|the) (?:wedding|big day)"],
+    "guest_count": [r"how many guests (?:am i|are we|do i|do we) (?:having|inviting|have)"],
+    "venue": [r"(?:where is|wheres) (?:my|our|the) (?:wedding|reception|ceremony)"],
+    "celebrant": [r"(?:who is|whos) (?:my|our|the) (?:celebrant|officiant)"],
+    "style": [r"what style is (?:my|our|the) wedding"],
+}
+
+_LEAD = (
+    r"(?:(?:hey|hi) (?:wedbot )?)?(?:please )?(?:can you )?"
+    r"(?:(?:tell me|remind me(?: of)?|show me|what is|whats|what was) )?"
+)
+_TAIL = r"(?: again| please| set to| now)*"
+
+
+def _alternation(options: list[str]) -> str:
+    return "(?:" + "|".join(options) + ")"
+
+
+_PATTERNS = [
+    (
+        field,
+        re.compile(
+            _LEAD + _alternation(
+                [r"(?:my|our|the) " + _alternation(list(map(re.escape, aliases)))]
+                + FIELD_QUESTIONS.get(field, [])
+            ) + _TAIL
+        )
+    )
+    for field, aliases in FIELD_ALIASES.items()
+]
+
+
+def match_profile_question(message: str) -> str | None:
+    """The profile field a message asks for, if that's all it asks."""
+    text = normalize(message)
+
+    for field, pattern in _PATTERNS:
+        if pattern.fullmatch(text):
+            return field
+    return None
+
+
+def format_value(field: str, value) -> str:
+    if field == "budget" and isinstance(value, (int, float)):
+        return f"{value:,.0f}"
+
+    if field == "wedding_date":
+        try:
+            d = date.fromisoformat(str(value)[:10])
+            return f"{d:%A}, {d:%B} {d.day}, {d.year}"
+        except ValueError:
+            pass
+
+    return str(value)
+
+
+class ProfileAnswerStats:
+    def __init__(self):
+        self.checked = 0
+        self.answered = 0
+        self._lock = threading.Lock()
+
+    def record(self, answered: bool) -> None:
+        with self._lock:
+            self.checked += 1
+            self.answered += answered
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "answered": self.answered,
+                "hit_rate": round(self.answered / self.checked, 4) if self.checked else 0.0
+            }
+
+
+profile_answer_stats = ProfileAnswerStats()
+
+
+async def answer_profile_question(user_id: str, message: str) -> str | None:
+    """A reply built from the profile snapshot, or None to ask the LLM."""
+    field = match_profile_question(message)
+    profile = await get_profile(user_id, fresh=True) if field else None
+
+    profile_answer_stats.record(profile is not None)
+
+    if profile is None:
+        return None
+
+    label = FIELD_LABELS[field]
+    value = profile.get(field)
+
+    if value in (None, ""):
+        return f"I don't have your {label} saved yet. Tell me and I'll add it."
+
+    return f"Your {label} is {format_value(field, value)}."
@@ -0,0 +1,71 @@
+from contextvars import ContextVar
+
+from app.cache import TTLCache
+from app.db import get_async_supabase
+
+# every users column the app reads, so one fetch serves all of them
+PROFILE_COLUMNS = [
+    "id", "role", "style", "budget", "guest_count",
+    "venue", "wedding_date", "celebrant"
+]
+
+# user_id -> users row. Writes in this worker invalidate it; writes made
+# through another worker show up here within the TTL, so anything shown
+# back to the user reads with fresh=True instead.
+profile_cache = TTLCache(maxsize=10_000, ttl=300)
+
+# per-request snapshots, so a request sees one consistent row even if
+# the process-level entry expires partway through: user_id -> (row,
+# whether it came straight from the DB)
+_request_profiles: ContextVar[dict | None] = ContextVar("request_profiles", default=None)
+
+
+def start_request_scope() -> None:
+    _request_profiles.set({})
+
+
+async def get_profile(user_id: str, fresh: bool = False) -> dict | None:
+    """
+    The user's row. With `fresh`, the process-level cache is skipped,
+    since another worker may have changed the row; the request snapshot
+    still serves it if this request already read the DB.
+    """
+    scope = _request_profiles.get()
+
+    if scope is not None and user_id in scope:
+        profile, from_db = scope[user_id]
+        if from_db or not fresh:
+            return dict(profile)
+
+    profile = None if fresh else profile_cache.get(user_id)
+    from_db = profile is None
+
+    if profile is None:
+        supabase = get_async_supabase()
+
+        rows = (
+            await supabase.table("users")
+            .select(",".join(PROFILE_COLUMNS))
+            .eq("id", user_id)
+            .limit(1)
+            .execute()
+        ).data
+
+        if not rows:
+            return None
+
+        profile = rows[0]
+        profile_cache.set(user_id, profile)
+
+    if scope is not None:
+        scope[user_id] = (profile, from_db)
+
+    return dict(profile)
+
+
+def invalidate_profile(user_id: str) -> None:
+    profile_cache.invalidate(user_id)
+
+    scope = _request_profiles.get()
+    if scope is not None:
+        scope.pop(user_id, None)
@@ -30,3 +30,22 @@ Rules:
 - No explanations
 - Return ONLY a JSON array of strings
 """
+SUMMARY_PROMPT = """
+You keep a running summary of a wedding-planning chat between a couple
+and WedBot.
+
+Current summary:
+{summary}
+
+Newer messages:
+{transcript}
+
+Rewrite the summary to include the newer messages. Keep decisions,
+preferences, open questions and anything the couple asked WedBot to
+remember. Leave out small talk.
+
+Rules:
+- At most 120 words
+- Plain sentences, no headings
+- Return ONLY the summary
+"""
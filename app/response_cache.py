@@ -0,0 +1,211 @@
+"""
+Shared cache of LLM replies to generic wedding questions.
+
+Only self-contained questions that aren't about the couple qualify (see
+cache_key()): anything mentioning "my"/"our", asking to change
+something, or leaning on earlier turns ("what about that?") bypasses
+the cache. Plain first-person phrasing ("how early should I book a
+photographer?") still counts as generic, unless it's about one of the
+saved wedding details ("how many guests should we invite?"), whose
+answer depends on the profile. Qualifying questions are answered without
+the profile, history or function calls, so the reply is safe to hand to
+anyone who asks the same thing.
+
+Lookups try the exact normalised text first, then near-duplicates: each
+question's content words get a MinHash signature, and LSH banding finds
+earlier questions whose estimated Jaccard similarity is at least
+`threshold` without comparing against every entry.
+"""
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+import hashlib
+import random
+import threading
+import time
+
+from app.intents import normalize
+
+# anything about the couple themselves, or a request to change something
+PERSONAL_WORDS = {
+    "my", "mine", "our", "ours",
+    "update", "change", "set", "save", "remember", "add", "remove", "delete", "cancel",
+}
+
+# generic on their own, personal next to a saved wedding detail
+FIRST_PERSON_WORDS = {"i", "im", "ive", "id", "me", "we", "were", "weve", "us"}
+PROFILE_WORDS = {
+    "budget", "guest", "guests", "venue", "venues", "date", "style",
+    "celebrant", "officiant",
+}
+
+# words that point back at earlier turns
+FOLLOW_UP_WORDS = {"it", "that", "this", "those", "these", "them", "they", "he", "she", "him", "her"}
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "be", "to", "of", "for", "in", "on", "at",
+    "and", "or", "do", "does", "should", "can", "could", "would", "you",
+    "what", "how", "when", "which", "who", "whats", "hows", "there", "any", "some",
+    "with", "about", "if", "need", "please",
+} | FIRST_PERSON_WORDS
+
+MIN_CONTENT_WORDS = 2
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+_PRIME = (1 << 61) - 1
+
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME))
+    for _ in range(NUM_PERM)
+]
+
+
+def content_words(text: str) -> frozenset[str]:
+    # crude plural folding so "photographers" matches "photographer"
+    return frozenset(
+        word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+        for word in text.split()
+        if word not in STOPWORDS
+    )
+
+
+def _hash(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "big")
+
+
+@lru_cache(maxsize=1024)
+def signature(text: str) -> tuple[int, ...]:
+    hashes = [_hash(word) for word in content_words(text)]
+    return tuple(
+        min((a * h + b) % _PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = 2000, ttl: float = 86_400, threshold: float = 0.8):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+
+        # normalised question -> (reply, expires_at, signature)
+        self._entries: OrderedDict[str, tuple] = OrderedDict()
+        # (band, band values) -> questions with that band
+        self._bands: dict[tuple, set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.approximate_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def cache_key(self, message: str) -> str | None:
+        """The normalised question, or None if it mustn't be cached."""
+        text = normalize(message)
+        words = set(text.split())
+
+        if (
+            words & PERSONAL_WORDS
+            or words & FOLLOW_UP_WORDS
+            or (words & FIRST_PERSON_WORDS and words & PROFILE_WORDS)
+            or len(content_words(text)) < MIN_CONTENT_WORDS
+        ):
+            with self._lock:
+                self.bypassed += 1
+            return None
+
+        return text
+
+    def _band_keys(self, sig: tuple[int, ...]):
+        for band in range(BANDS):
+            yield band, sig[band * ROWS:(band + 1) * ROWS]
+
+    def _remove(self, text: str) -> None:
+        entry = self._entries.pop(text, None)
+        if entry is None:
+            return
+
+        for key in self._band_keys(entry[2]):
+            bucket = self._bands.get(key)
+            if bucket is not None:
+                bucket.discard(text)
+                if not bucket:
+                    del self._bands[key]
+
+    def _live(self, text: str):
+        entry = self._entries.get(text)
+
+        if entry is not None and entry[1] < time.monotonic():
+            self._remove(text)
+            return None
+        return entry
+
+    def get(self, text: str) -> str | None:
+        sig = signature(text)
+
+        with self._lock:
+            entry = self._live(text)
+
+            if entry is not None:
+                self._entries.move_to_end(text)
+                self.exact_hits += 1
+                return entry[0]
+
+            candidates = set()
+            for key in self._band_keys(sig):
+                candidates |= self._bands.get(key, set())
+
+            best, best_score = None, self.threshold
+
+            for candidate in candidates:
+                entry = self._live(candidate)
+                if entry is None:
+                    continue
+
+                score = similarity(sig, entry[2])
+                if score >= best_score:
+                    best, best_score = candidate, score
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best)
+            self.approximate_hits += 1
+            return self._entries[best][0]
+
+    def set(self, text: str, reply: str) -> None:
+        sig = signature(text)
+
+        with self._lock:
+            self._remove(text)
+            self._entries[text] = (reply, time.monotonic() + self.ttl, sig)
+
+            for key in self._band_keys(sig):
+                self._bands[key].add(text)
+
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.exact_hits + self.approximate_hits
+            lookups = hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "exact_hits": self.exact_hits,
+                "approximate_hits": self.approximate_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+            }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,207 @@
+"""
+Weekly scheduling engine for checklist tasks.
+
+Checklist tasks are free-text titles, so each one is first bucketed into
+a category by keyword. Categories carry a lead time (how many weeks
+before the wedding the work should be done) and may depend on other
+categories (the venue has to be booked before decor is planned).
+
+plan_schedule() is a list scheduler: week by week it takes up to
+`capacity` released tasks off a heap ordered by deadline. A category's
+tasks are released the week after every category it depends on has
+been fully scheduled. Each task goes through the heaps at most twice,
+so a plan is O(n log n) in the number of tasks.
+"""
+from collections import defaultdict
+import heapq
+import math
+import re
+
+CATEGORY_KEYWORDS = {
+    "venue": ["venue", "reception site", "ceremony site", "location"],
+    "photography": ["photographer", "videographer", "photo", "video"],
+    "catering": ["cater", "menu", "tasting", "cake", "drinks"],
+    "officiant": ["officiant", "celebrant", "priest", "imam", "rabbi"],
+    "attire": ["dress", "gown", "suit", "tux", "attire", "veil", "shoes", "ring"],
+    "music": ["band", "dj", "music", "playlist", "song"],
+    "decor": ["decor", "florist", "flower", "centerpiece", "lighting", "linen"],
+    "invitations": ["invitation", "save the date", "save-the-date", "stationery", "rsvp"],
+    "guests": ["guest list", "seating", "accommodation", "welcome bag"],
+    "legal": ["license", "licence", "marriage certificate", "name change"],
+}
+
+# weeks before the wedding each category should be finished
+LEAD_TIME_WEEKS = {
+    "venue": 40,
+    "photography": 36,
+    "catering": 30,
+    "officiant": 30,
+    "attire": 26,
+    "music": 24,
+    "decor": 20,
+    "invitations": 12,
+    "guests": 6,
+    "legal": 4,
+    "general": 0,
+}
+
+# category -> categories that must be fully scheduled first
+DEPENDENCIES = {
+    "catering": ["venue"],
+    "decor": ["venue"],
+    "music": ["venue"],
+    "invitations": ["venue"],
+    "guests": ["invitations"],
+}
+
+DEFAULT_CATEGORY = "general"
+
+
+class ScheduleRules:
+    def __init__(
+        self,
+        keywords: dict = CATEGORY_KEYWORDS,
+        lead_times: dict = LEAD_TIME_WEEKS,
+        dependencies: dict = DEPENDENCIES
+    ):
+        self.keywords = keywords
+        self.lead_times = lead_times
+        self.dependencies = dependencies
+        self._check_acyclic()
+
+        # keywords match at a word start, so "cater" hits "catering"
+        # but "ring" doesn't hit "bring"
+        self._patterns = [
+            (category, re.compile(r"\b(?:" + "|".join(map(re.escape, words)) + ")"))
+            for category, words in keywords.items()
+        ]
+
+    def _check_acyclic(self) -> None:
+        indegree = defaultdict(int)
+        dependents = defaultdict(list)
+
+        for category, prereqs in self.dependencies.items():
+            for prereq in prereqs:
+                indegree[category] += 1
+                dependents[prereq].append(category)
+
+        nodes = set(indegree) | set(dependents)
+        queue = [c for c in nodes if indegree[c] == 0]
+        seen = 0
+
+        while queue:
+            category = queue.pop()
+            seen += 1
+            for dependent in dependents[category]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    queue.append(dependent)
+
+        if seen != len(nodes):
+            raise ValueError("Category dependencies contain a cycle")
+
+    def classify(self, title: str) -> str:
+        text = title.lower()
+
+        for category, pattern in self._patterns:
+            if pattern.search(text):
+                return category
+        return DEFAULT_CATEGORY
+
+    def deadline(self, category: str, weeks_remaining: int) -> int:
+        lead = self.lead_times.get(category, 0)
+        return max(1, weeks_remaining - lead)
+
+
+DEFAULT_RULES = ScheduleRules()
+
+
+def plan_schedule(
+    tasks: list[dict],
+    weeks_remaining: int,
+    capacity: int | None = None,
+    rules: ScheduleRules = DEFAULT_RULES
+) -> list[dict]:
+    """
+    Assign each task (needs "id" and "title") a scheduled_week in
+    1..weeks_remaining.
+
+    `capacity` is the most tasks per week; by default the tasks are
+    spread evenly. Work that can't fit before the wedding (tight
+    deadlines, long dependency chains) lands in the final week.
+    Returns [{"id", "scheduled_week", "category"}] in scheduling order.
+    """
+    if not tasks:
+        return []
+
+    weeks_remaining = max(1, weeks_remaining)
+    capacity = capacity or math.ceil(len(tasks) / weeks_remaining)
+
+    by_category = defaultdict(list)
+
+    for seq, task in enumerate(tasks):
+        category = rules.classify(task.get("title") or "")
+        deadline = rules.deadline(category, weeks_remaining)
+        by_category[category].append((deadline, seq, task, category))
+
+    # dependency graph restricted to categories that actually have tasks
+    indegree = {}
+    dependents = defaultdict(list)
+
+    for category in by_category:
+        prereqs = [p for p in rules.dependencies.get(category, []) if p in by_category]
+        indegree[category] = len(prereqs)
+        for prereq in prereqs:
+            dependents[prereq].append(category)
+
+    remaining = {c: len(items) for c, items in by_category.items()}
+    release_week = {c: 1 for c in by_category}
+
+    # (release_week, deadline, seq, task, category) -> waiting on dependencies
+    waiting = []
+    # (deadline, seq, task, category) -> can be scheduled now
+    ready = []
+
+    for category, degree in indegree.items():
+        if degree == 0:
+            for item in by_category[category]:
+                heapq.heappush(waiting, (1, *item))
+
+    assignments = []
+    week = 1
+
+    while waiting or ready:
+        if not ready and waiting[0][0] > week:
+            week = waiting[0][0]
+
+        while waiting and waiting[0][0] <= week:
+            heapq.heappush(ready, heapq.heappop(waiting)[1:])
+
+        placed = 0
+
+        while ready and placed < capacity:
+            deadline, seq, task, category = heapq.heappop(ready)
+
+            assignments.append({
+                "id": task["id"],
+                "scheduled_week": min(week, weeks_remaining),
+                "category": category
+            })
+            placed += 1
+
+            remaining[category] -= 1
+
+            if remaining[category] == 0:
+                for dependent in dependents[category]:
+                    indegree[dependent] -= 1
+                    release_week[dependent] = max(release_week[dependent], week + 1)
+
+                    if indegree[dependent] == 0:
+                        for item in by_category[dependent]:
+                            heapq.heappush(
+                                waiting, (release_week[dependent], *item)
+                            )
+
+        week += 1
+
+    return assignments
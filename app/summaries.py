@@ -0,0 +1,174 @@
+"""
+Rolling summary tier for conversation history.
+
+Prompts get one summary of the older conversation plus, verbatim, every
+buffered message after its summarized_seq. Once SUMMARY_BATCH messages
+have fallen out of the newest RECENT_TURNS, a background worker folds
+them into the user's conversation_summaries row
+(sql/conversation_summaries.sql), which shrinks the verbatim part back
+down.
+
+The ring buffer keeps MAX_TURNS rows, so those messages have to be
+summarised before they're overwritten. With RECENT_TURNS + SUMMARY_BATCH
+below MAX_TURNS, that leaves a couple of messages of headroom for the
+worker to catch up.
+"""
+import asyncio
+from datetime import datetime
+
+from app.cache import TTLCache
+from app.db import get_async_supabase
+from app.llm import chat_completion
+from app.prompts import SUMMARY_PROMPT
+
+RECENT_TURNS = 4
+SUMMARY_BATCH = 4
+MAX_QUEUED_USERS = 1000
+
+# gives the write-behind conversation store time to flush the turn
+# that triggered the request before we read conversation_buffer
+SUMMARY_DELAY_SECONDS = 2.0
+
+# user_id -> (summary text, seq of the last message it covers);
+# ("", 0) when there isn't one yet
+summary_cache = TTLCache(maxsize=10_000, ttl=300)
+
+
+async def get_summary(user_id: str) -> tuple[str, int]:
+    cached = summary_cache.get(user_id)
+
+    if cached is None:
+        supabase = get_async_supabase()
+
+        rows = (
+            await supabase.table("conversation_summaries")
+            .select("summary,summarized_seq")
+            .eq("user_id", user_id)
+            .limit(1)
+            .execute()
+        ).data
+
+        cached = (rows[0]["summary"], rows[0]["summarized_seq"]) if rows else ("", 0)
+        summary_cache.set(user_id, cached)
+
+    return cached
+
+
+def format_transcript(rows: list[dict]) -> str:
+    return "\n".join(f"{row['role']}: {row['message']}" for row in rows)
+
+
+class ConversationSummarizer:
+    """
+    Folds aged-out turns into the summary off the request path.
+    request() only notes that a user may need summarising; `workers`
+    tasks pick users up after SUMMARY_DELAY_SECONDS, and a user already
+    waiting or being summarised isn't queued again.
+    """
+
+    def __init__(self, workers: int = 4):
+        self.workers = workers
+        self._queue: asyncio.Queue | None = None
+        self._queued: set[str] = set()
+        self._tasks: list[asyncio.Task] = []
+
+    def request(self, user_id: str) -> None:
+        if self._queue is None or user_id in self._queued:
+            return
+
+        self._queued.add(user_id)
+        asyncio.get_running_loop().call_later(
+            SUMMARY_DELAY_SECONDS, self._enqueue, user_id
+        )
+
+    def _enqueue(self, user_id: str) -> None:
+        if self._queue is None:
+            return
+
+        try:
+            self._queue.put_nowait(user_id)
+        except asyncio.QueueFull:
+            # the next append for this user asks again
+            self._queued.discard(user_id)
+
+    async def summarize(self, user_id: str) -> None:
+        supabase = get_async_supabase()
+
+        current = (
+            await supabase.table("conversation_summaries")
+            .select("summary,summarized_seq")
+            .eq("user_id", user_id)
+            .limit(1)
+            .execute()
+        ).data
+
+        summary = current[0]["summary"] if current else ""
+        summarized_seq = current[0]["summarized_seq"] if current else 0
+
+        rows = (
+            await supabase.table("conversation_buffer")
+            .select("seq,role,message")
+            .eq("user_id", user_id)
+            .gt("seq", summarized_seq)
+            .order("seq")
+            .execute()
+        ).data
+
+        aged_out = rows[:-RECENT_TURNS]
+
+        if len(aged_out) < SUMMARY_BATCH:
+            return
+
+        response = await chat_completion(
+            model="gpt-4o-mini",
+            messages=[{
+                "role": "user",
+                "content": SUMMARY_PROMPT.format(
+                    summary=summary or "(none yet)",
+                    transcript=format_transcript(aged_out)
+                )
+            }]
+        )
+
+        summary = response.choices[0].message["content"].strip()
+        summarized_seq = aged_out[-1]["seq"]
+
+        await supabase.table("conversation_summaries").upsert({
+            "user_id": user_id,
+            "summary": summary,
+            "summarized_seq": summarized_seq,
+            "updated_at": datetime.utcnow().isoformat()
+        }).execute()
+
+        summary_cache.set(user_id, (summary, summarized_seq))
+
+    async def _worker(self) -> None:
+        while True:
+            user_id = await self._queue.get()
+
+            try:
+                await self.summarize(user_id)
+            except Exception as e:
+                print("CONVERSATION SUMMARY ERROR:", e)
+            finally:
+                self._queued.discard(user_id)
+
+    async def start(self) -> None:
+        if not self._tasks:
+            self._queue = asyncio.Queue(maxsize=MAX_QUEUED_USERS)
+            self._tasks = [
+                asyncio.create_task(self._worker())
+                for _ in range(self.workers)
+            ]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        self._tasks = []
+        self._queue = None
+        self._queued.clear()
+
+
+conversation_summarizer = ConversationSummarizer()
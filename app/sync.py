@@ -0,0 +1,238 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta, timezone
+import json
+
+from app.db import get_async_supabase
+
+# table -> columns returned when the client doesn't ask for a projection
+FEED_TABLES = {
+    "tasks": ["id", "title", "status", "completed", "scheduled_week", "updated_at"],
+    "budget_categories": ["id", "category", "allocated", "spent", "updated_at"],
+    "users": ["id", "style", "budget", "guest_count", "venue", "wedding_date", "celebrant", "updated_at"],
+    "timelines": ["id", "label", "start_time", "end_time"],
+    "vendor_shortlist": ["id", "vendor_id"],
+}
+
+# every column a client may ask for through `fields`
+FEED_COLUMNS = {
+    "tasks": FEED_TABLES["tasks"] + ["checklist_id", "created_at"],
+    "budget_categories": FEED_TABLES["budget_categories"] + ["created_at"],
+    "users": FEED_TABLES["users"],
+    "timelines": FEED_TABLES["timelines"],
+    "vendor_shortlist": FEED_TABLES["vendor_shortlist"],
+}
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+CHANGE_LOG_RETENTION = timedelta(days=30)
+
+# change_log.seq comes from a sequence, so a transaction that took a
+# lower seq can commit after one with a higher seq. Only reading entries
+# older than this lag keeps a cursor from skipping past them. changed_at
+# is the time the row was written (clock_timestamp()), not the commit,
+# so a transaction that stays open for longer than the lag after writing
+# can still be skipped; the app's writes are single statements or RPCs.
+SAFETY_LAG = timedelta(seconds=2)
+
+CURSOR_VERSION = 1
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def encode_cursor(seq: int) -> str:
+    payload = {
+        "v": CURSOR_VERSION,
+        "seq": seq,
+        "at": int(datetime.now(timezone.utc).timestamp())
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> int:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        seq = int(payload["seq"])
+        issued = datetime.fromtimestamp(payload["at"], timezone.utc)
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+
+    if payload.get("v") != CURSOR_VERSION:
+        raise InvalidCursor("Invalid cursor")
+
+    if datetime.now(timezone.utc) - issued > CHANGE_LOG_RETENTION:
+        raise CursorExpired("Cursor expired, full resync required")
+
+    return seq
+
+
+def parse_fields(fields: str | None) -> dict[str, list[str]]:
+    """
+    "tasks.title,tasks.status,users.budget" -> per-table column lists.
+    Tables not mentioned keep their FEED_TABLES defaults; "id" is always
+    included so clients can key rows.
+    """
+    projection = {table: list(columns) for table, columns in FEED_TABLES.items()}
+
+    if not fields:
+        return projection
+
+    requested: dict[str, list[str]] = {}
+
+    for item in fields.split(","):
+        table, _, column = item.strip().partition(".")
+
+        if column not in FEED_COLUMNS.get(table, ()):
+            raise ValueError(f"Invalid field: {item}")
+
+        requested.setdefault(table, ["id"])
+        if column not in requested[table]:
+            requested[table].append(column)
+
+    projection.update(requested)
+    return projection
+
+
+async def _fetch_rows(table: str, ids: list[str], columns: list[str]) -> list[dict]:
+    if not ids:
+        return []
+
+    supabase = get_async_supabase()
+
+    return (
+        await supabase.table(table)
+        .select(",".join(columns))
+        .in_("id", ids)
+        .execute()
+    ).data
+
+
+async def _fetch_user_rows(user_id: str, table: str, columns: list[str]) -> list[dict]:
+    supabase = get_async_supabase()
+    owner = "id" if table == "users" else "user_id"
+
+    return (
+        await supabase.table(table)
+        .select(",".join(columns))
+        .eq(owner, user_id)
+        .execute()
+    ).data
+
+
+async def get_snapshot(user_id: str, projection: dict[str, list[str]]) -> dict:
+    """
+    Every current row of the user's synced tables, for a client with no
+    cursor. The cursor is taken before the rows are read, so anything
+    written meanwhile is replayed by the next feed page rather than lost.
+    """
+    supabase = get_async_supabase()
+    visible_before = (datetime.now(timezone.utc) - SAFETY_LAG).isoformat()
+
+    latest = (
+        await supabase.table("change_log")
+        .select("seq")
+        .eq("user_id", user_id)
+        .lt("changed_at", visible_before)
+        .order("seq", desc=True)
+        .limit(1)
+        .execute()
+    ).data
+
+    rows = await asyncio.gather(*(
+        _fetch_user_rows(user_id, table, projection[table])
+        for table in FEED_TABLES
+    ))
+
+    return {
+        "changes": {
+            table: {"upserts": table_rows, "deletes": []}
+            for table, table_rows in zip(FEED_TABLES, rows)
+        },
+        "cursor": encode_cursor(latest[0]["seq"] if latest else 0),
+        "has_more": False,
+        "snapshot": True
+    }
+
+
+async def get_change_feed(
+    user_id: str,
+    cursor: str | None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: str | None = None
+) -> dict:
+    """
+    One page of the user's change feed after `cursor`.
+
+    Entries are collapsed to the latest op per row: upserted rows are
+    returned with the projected columns, deleted rows as tombstone ids.
+    Pass the returned cursor back to continue; has_more says whether to
+    page again straight away. Without a cursor the response is a full
+    snapshot (snapshot: true) that replaces whatever the client holds.
+    """
+    projection = parse_fields(fields)
+
+    if not cursor:
+        return await get_snapshot(user_id, projection)
+
+    after = decode_cursor(cursor)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    supabase = get_async_supabase()
+    visible_before = (datetime.now(timezone.utc) - SAFETY_LAG).isoformat()
+
+    entries = (
+        await supabase.table("change_log")
+        .select("seq,table_name,row_id,op")
+        .eq("user_id", user_id)
+        .gt("seq", after)
+        .lt("changed_at", visible_before)
+        .order("seq")
+        .limit(limit + 1)
+        .execute()
+    ).data
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest: dict[tuple[str, str], str] = {}
+
+    for entry in entries:
+        if entry["table_name"] in FEED_TABLES:
+            latest[(entry["table_name"], entry["row_id"])] = entry["op"]
+
+    upserts: dict[str, list[str]] = {table: [] for table in FEED_TABLES}
+    deletes: dict[str, list[str]] = {table: [] for table in FEED_TABLES}
+
+    for (table, row_id), op in latest.items():
+        (deletes if op == "delete" else upserts)[table].append(row_id)
+
+    rows = await asyncio.gather(*(
+        _fetch_rows(table, ids, projection[table])
+        for table, ids in upserts.items()
+    ))
+
+    changes = {}
+
+    for table, table_rows in zip(upserts, rows):
+        if table_rows or deletes[table]:
+            changes[table] = {
+                "upserts": table_rows,
+                "deletes": deletes[table]
+            }
+
+    next_seq = entries[-1]["seq"] if entries else after
+
+    return {
+        "changes": changes,
+        "cursor": encode_cursor(next_seq),
+        "has_more": has_more,
+        "snapshot": False
+    }
@@ -0,0 +1,108 @@
+import asyncio
+from collections import defaultdict
+import random
+
+from app.cache import TTLCache
+from app.db import get_async_supabase
+
+
+class WellnessLibrary:
+    """
+    The wellness_content table, held in memory and indexed by type.
+
+    The corpus is small and rarely edited, so it's loaded once at
+    startup and reloaded every `refresh_interval` seconds. pick() serves
+    each user whichever items of a type they've been shown least
+    recently, choosing at random among ties, so repeats only come after
+    everything of that type has been shown.
+    """
+
+    def __init__(self, refresh_interval: float = 600, max_users: int = 10_000):
+        self.refresh_interval = refresh_interval
+        self._items: dict[str, list[dict]] = {}
+        self._loaded = False
+        self._task: asyncio.Task | None = None
+        self._tick = 0
+
+        # user_id -> {item id: tick when last shown}
+        self._shown = TTLCache(maxsize=max_users, ttl=86_400)
+
+    async def load(self) -> None:
+        supabase = get_async_supabase()
+
+        rows = (
+            await supabase.table("wellness_content")
+            .select("id,type,title,content")
+            .execute()
+        ).data
+
+        items = defaultdict(list)
+        for row in rows or []:
+            items[row["type"]].append(row)
+
+        self._items = dict(items)
+        self._loaded = True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.load()
+            except Exception as e:
+                # keep serving the last good copy
+                print("WELLNESS REFRESH ERROR:", e)
+
+    async def start(self) -> None:
+        try:
+            await self.load()
+        except Exception as e:
+            print("WELLNESS LOAD ERROR:", e)
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def pick(self, user_id: str, content_type: str) -> dict | None:
+        if not self._loaded:
+            # startup load failed; try again rather than serve nothing
+            try:
+                await self.load()
+            except Exception as e:
+                print("WELLNESS LOAD ERROR:", e)
+                return None
+
+        items = self._items.get(content_type)
+        if not items:
+            return None
+
+        shown = self._shown.get(user_id)
+        if shown is None:
+            shown = {}
+            self._shown.set(user_id, shown)
+
+        oldest = min(shown.get(item["id"], 0) for item in items)
+        item = random.choice([
+            item for item in items
+            if shown.get(item["id"], 0) == oldest
+        ])
+
+        self._tick += 1
+        shown[item["id"]] = self._tick
+        return item
+
+    def stats(self) -> dict:
+        return {
+            "types": {t: len(items) for t, items in self._items.items()},
+            "loaded": self._loaded
+        }
+
+
+wellness_library = WellnessLibrary()
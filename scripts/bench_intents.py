@@ -0,0 +1,109 @@
+"""
+Compare the chat pre-router with the old per-keyword substring scan.
+
+The old check ran `keyword in question` once per keyword, so its cost
+grows with keywords x message length. Both are timed over messages of
+increasing length and over a keyword list padded out with synthetic
+intents, to show how each scales. ROUTING_CASES are checked first, so a
+rules change that misroutes a known message fails before any timing:
+
+    python -m scripts.bench_intents --extra-intents 50
+"""
+import argparse
+import random
+import string
+import timeit
+
+from app.intents import DEFAULT_INTENT_RULES, IntentRouter
+
+OLD_STRESS_KEYWORDS = [
+    "stressed", "overwhelmed", "anxious",
+    "panic", "too much", "cant handle",
+    "tired", "exhausted"
+]
+
+
+# message -> intent the default rules must route it to
+ROUTING_CASES = {
+    "I'm so stressed about the seating plan": "stress",
+    "stressing over the budget": "stress",
+    "feeling overwhelmed": "stress",
+    "stress-free wedding ideas": None,
+    "what's the most stressful part of planning?": None,
+    "can you create a checklist": "create_checklist",
+    "make a checklist": None,
+}
+
+
+def check_routing(router: IntentRouter) -> None:
+    wrong = {
+        text: (router.match(text), expected)
+        for text, expected in ROUTING_CASES.items()
+        if router.match(text) != expected
+    }
+
+    if wrong:
+        raise SystemExit(f"misrouted (got, expected): {wrong}")
+
+
+def old_route(question: str, keywords: list[str]) -> str | None:
+    if any(keyword in question for keyword in keywords):
+        return "stress"
+    if "checklist" in question and "create" in question:
+        return "create_checklist"
+    return None
+
+
+def synthetic_rules(extra: int) -> dict:
+    rng = random.Random(0)
+    rules = dict(DEFAULT_INTENT_RULES)
+
+    for i in range(extra):
+        rules[f"intent_{i}"] = [[
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10)))
+            for _ in range(8)
+        ]]
+
+    return rules
+
+
+def message(words: int) -> str:
+    rng = random.Random(words)
+    vocab = ["we", "need", "to", "book", "the", "venue", "and", "florist",
+             "before", "june", "guests", "budget", "about", "our", "dress"]
+    return " ".join(rng.choice(vocab) for _ in range(words))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--extra-intents", type=int, default=50)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    check_routing(IntentRouter(DEFAULT_INTENT_RULES))
+
+    rules = synthetic_rules(args.extra_intents)
+    router = IntentRouter(rules)
+    keywords = OLD_STRESS_KEYWORDS + [
+        keyword for intent, groups in rules.items()
+        if intent.startswith("intent_")
+        for keyword in groups[0]
+    ]
+
+    print(f"{len(keywords)} keywords, {len(rules)} intents")
+
+    for words in (5, 20, 80, 320):
+        text = message(words)
+
+        old = timeit.timeit(lambda: old_route(text.lower(), keywords), number=args.number)
+        new = timeit.timeit(lambda: router.match(text), number=args.number)
+
+        print(
+            f"{words:>4} words  "
+            f"substring {old / args.number * 1e6:>8.1f} us  "
+            f"router {new / args.number * 1e6:>8.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
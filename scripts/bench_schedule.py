@@ -0,0 +1,90 @@
+"""
+Compare the old per-row schedule write with the bulk schedule_tasks RPC.
+
+Runs offline against a stand-in client that sleeps for a fixed
+round-trip latency per request, so the numbers reflect round-trip count
+rather than Supabase load:
+
+    python -m scripts.bench_schedule --tasks 80 --latency-ms 25
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+import uuid
+
+from app import db
+from app.main import write_schedule
+from app.scheduling import plan_schedule
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    async def execute(self):
+        self.client.round_trips += 1
+        await asyncio.sleep(self.client.latency)
+
+
+class FakeClient:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.round_trips = 0
+
+    def table(self, name):
+        return FakeQuery(self)
+
+    def rpc(self, name, params):
+        return FakeQuery(self)
+
+
+async def per_row_write(assignments: list[dict]) -> None:
+    supabase = db.get_async_supabase()
+
+    for a in assignments:
+        await supabase.table("tasks").update({
+            "scheduled_week": a["scheduled_week"],
+            "updated_at": datetime.utcnow().isoformat()
+        }).eq("id", a["id"]).execute()
+
+
+async def run(n_tasks: int, weeks: int, latency_ms: float) -> None:
+    tasks = [
+        {"id": str(uuid.uuid4()), "title": f"Task {i}"}
+        for i in range(n_tasks)
+    ]
+    assignments = plan_schedule(tasks, weeks)
+
+    for label, write in [
+        ("per-row loop", per_row_write),
+        ("bulk rpc", lambda a: write_schedule("bench-user", a)),
+    ]:
+        client = FakeClient(latency_ms / 1000)
+        db._async_supabase = client
+
+        start = time.perf_counter()
+        await write(assignments)
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"{label:<14} {client.round_trips:>4} round-trips "
+            f"{elapsed * 1000:>9.1f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=80)
+    parser.add_argument("--weeks", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=25)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.tasks, args.weeks, args.latency_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Measure worker cold-start cost of `import app.main`.
+
+Each run imports the app in a fresh interpreter and reports wall time
+and peak RSS. The "eager" variant also imports the export stack up
+front, which is what every worker paid before exports were lazy:
+
+    python -m scripts.bench_startup --runs 10
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import resource, sys, time
+start = time.perf_counter()
+import app.main
+{extra}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, rss_kb, int("reportlab" in sys.modules))
+"""
+
+VARIANTS = {
+    "lazy": "",
+    "eager": "import reportlab.pdfgen.canvas, reportlab.lib.pagesizes\n"
+             "try:\n    import pandas\nexcept ImportError:\n    pass",
+}
+
+
+def measure(extra: str) -> tuple[float, int, int]:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(extra=extra)],
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout.split()
+    return float(out[0]), int(out[1]), int(out[2])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, extra in VARIANTS.items():
+        results = [measure(extra) for _ in range(args.runs)]
+        times = [r[0] for r in results]
+        rss = [r[1] for r in results]
+
+        print(
+            f"{name:<6} import {statistics.median(times) * 1000:>7.1f} ms  "
+            f"peak RSS {statistics.median(rss) / 1024:>6.1f} MB  "
+            f"reportlab loaded: {bool(results[0][2])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+-- Unified change feed for /sync/feed (app/sync.py).
+--
+-- Every insert/update/delete on the synced tables appends a row here,
+-- so clients can page forward from a cursor (seq) and see deletes as
+-- tombstones. Prune rows older than CHANGE_LOG_RETENTION_DAYS with
+-- delete_old_changes(); cursors older than that get a 410 and resync.
+
+create table if not exists change_log (
+    seq bigserial primary key,
+    user_id uuid not null,
+    table_name text not null,
+    row_id text not null,
+    op text not null check (op in ('upsert', 'delete')),
+    changed_at timestamptz not null default clock_timestamp()
+);
+
+-- now() is the transaction start, so a long transaction would log its
+-- changes as older than they are; clock_timestamp() is when the row
+-- was actually written
+alter table change_log alter column changed_at set default clock_timestamp();
+
+create index if not exists change_log_user_seq on change_log (user_id, seq);
+
+create or replace function log_change()
+returns trigger
+language plpgsql
+as $$
+declare
+    r record;
+    owner uuid;
+begin
+    if tg_op = 'DELETE' then
+        r := old;
+    else
+        r := new;
+    end if;
+
+    if tg_table_name = 'users' then
+        owner := r.id;
+    else
+        owner := r.user_id;
+    end if;
+
+    insert into change_log (user_id, table_name, row_id, op)
+    values (
+        owner,
+        tg_table_name,
+        r.id::text,
+        case when tg_op = 'DELETE' then 'delete' else 'upsert' end
+    );
+
+    return null;
+end;
+$$;
+
+drop trigger if exists change_log_tasks on tasks;
+create trigger change_log_tasks
+    after insert or update or delete on tasks
+    for each row execute function log_change();
+
+drop trigger if exists change_log_budget_categories on budget_categories;
+create trigger change_log_budget_categories
+    after insert or update or delete on budget_categories
+    for each row execute function log_change();
+
+drop trigger if exists change_log_users on users;
+create trigger change_log_users
+    after insert or update or delete on users
+    for each row execute function log_change();
+
+drop trigger if exists change_log_timelines on timelines;
+create trigger change_log_timelines
+    after insert or update or delete on timelines
+    for each row execute function log_change();
+
+drop trigger if exists change_log_vendor_shortlist on vendor_shortlist;
+create trigger change_log_vendor_shortlist
+    after insert or update or delete on vendor_shortlist
+    for each row execute function log_change();
+
+create or replace function delete_old_changes(p_days int default 30)
+returns void
+language sql
+as $$
+    delete from change_log where changed_at < now() - make_interval(days => p_days);
+$$;
@@ -0,0 +1,10 @@
+-- Single-flight guard for first-time checklist generation
+-- (app.planning.get_or_create_tasks). A worker only generates a
+-- checklist if it manages to insert the user's row here; the row is
+-- removed once the tasks are written, or treated as stale after
+-- CLAIM_TTL_SECONDS if that worker died.
+
+create table if not exists checklist_generation_claims (
+    user_id uuid primary key,
+    claimed_at timestamptz not null default now()
+);
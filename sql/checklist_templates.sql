@@ -0,0 +1,8 @@
+-- Persisted tier of the checklist template cache (app/checklist_cache.py).
+-- Only used when CHECKLIST_CACHE_PERSIST is enabled.
+
+create table if not exists checklist_templates (
+    bucket text primary key,
+    tasks jsonb not null,
+    created_at timestamptz not null default now()
+);
@@ -0,0 +1,54 @@
+-- Ring-buffer layout for conversation_buffer.
+--
+-- Each user owns at most MAX_TURNS rows, addressed by slot = seq % MAX_TURNS.
+-- append_conversation writes a batch of messages in one round-trip by
+-- overwriting the oldest slots, so nothing ever has to be selected or
+-- deleted to trim history. Keep p_max_turns in sync with app.memory.MAX_TURNS.
+
+alter table conversation_buffer add column if not exists seq bigint;
+alter table conversation_buffer add column if not exists slot int;
+
+-- backfill rows written before the ring buffer existed
+update conversation_buffer c
+set seq = r.rn, slot = r.rn % 10
+from (
+    select id, row_number() over (partition by user_id order by created_at) as rn
+    from conversation_buffer
+) r
+where c.id = r.id and c.seq is null;
+
+create unique index if not exists conversation_buffer_user_slot
+    on conversation_buffer (user_id, slot);
+
+create or replace function append_conversation(
+    p_user_id uuid,
+    p_messages jsonb,
+    p_max_turns int
+)
+returns void
+language plpgsql
+as $$
+declare
+    next_seq bigint;
+    m jsonb;
+begin
+    -- serialise concurrent appends for the same user
+    perform pg_advisory_xact_lock(hashtext(p_user_id::text));
+
+    select coalesce(max(seq), 0) into next_seq
+    from conversation_buffer
+    where user_id = p_user_id;
+
+    for m in select * from jsonb_array_elements(p_messages) loop
+        next_seq := next_seq + 1;
+
+        insert into conversation_buffer (user_id, seq, slot, role, message, created_at)
+        values (p_user_id, next_seq, next_seq % p_max_turns, m->>'role', m->>'message', now())
+        on conflict (user_id, slot) do update
+            set seq = excluded.seq,
+                role = excluded.role,
+                message = excluded.message,
+                created_at = excluded.created_at;
+    end loop;
+end;
+$$;
@@ -0,0 +1,10 @@
+-- Rolling per-user summary of conversation turns that have aged out of
+-- the recent window (see app/summaries.py). summarized_seq is the last
+-- conversation_buffer.seq folded into the summary.
+
+create table if not exists conversation_summaries (
+    user_id uuid primary key,
+    summary text not null,
+    summarized_seq bigint not null default 0,
+    updated_at timestamptz not null default now()
+);
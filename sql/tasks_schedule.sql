@@ -0,0 +1,28 @@
+-- Bulk write for /schedule/generate.
+--
+-- p_assignments is a JSON array of {"id": <task id>, "scheduled_week": <int>}.
+-- Every row is updated in a single statement; rows that don't belong to
+-- p_user_id are ignored. Returns the number of tasks updated.
+
+create or replace function schedule_tasks(
+    p_user_id uuid,
+    p_assignments jsonb
+)
+returns int
+language sql
+as $$
+    with assignments as (
+        select *
+        from jsonb_to_recordset(p_assignments) as a(id uuid, scheduled_week int)
+    ),
+    updated as (
+        update tasks t
+        set scheduled_week = a.scheduled_week,
+            updated_at = now()
+        from assignments a
+        where t.id = a.id
+          and t.user_id = p_user_id
+        returning 1
+    )
+    select count(*)::int from updated;
+$$;